@@ -0,0 +1,253 @@
+"""Replays a synthetic message stream through the highlight hot path.
+
+Guilds, highlights and messages are generated from a fixed seed, the
+database is replaced by an in-memory loader and REST permission lookups by
+a stub, so results only reflect our own code and are comparable across
+commits:
+
+    python -m benchmarks.highlights --json before.json
+    git checkout other-branch
+    python -m benchmarks.highlights --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing as t
+from dataclasses import asdict, dataclass
+
+from wires.database.models import Highlight
+from wires.plugins.highlights import plugin as highlights
+from wires.plugins.highlights._index import HighlightIndex
+
+WORDS = [
+    f"{a}{b}"
+    for a in ("ka", "lo", "mi", "ne", "su", "ta", "vo", "ri", "pe", "zu")
+    for b in ("ba", "de", "fi", "go", "hu", "ja", "ke", "li", "mo", "nu")
+]
+REGEX_TEMPLATES = [r"\b{}\b", r"(?i){}s?", r"{}\d+", r"^{}", r"{}|{}"]
+
+
+@dataclass
+class Params:
+    guilds: int
+    users: int
+    highlights: int
+    regex_ratio: float
+    list_ratio: float
+    channels: int
+    messages: int
+    words: int
+    rest_latency: float
+    seed: int
+
+
+@dataclass
+class Results:
+    messages_per_second: float
+    p50_us: float
+    p99_us: float
+    notifications: int
+    peak_kib_per_message: float
+    retained_bytes_per_message: float
+
+
+class StubIndex(HighlightIndex):
+    def __init__(self, rows: dict[int, list[Highlight]]) -> None:
+        super().__init__(len(rows) or 1)
+        self.rows = rows
+
+    async def _fetch(self, guild_id: int) -> t.Iterable[Highlight]:
+        return self.rows.get(guild_id, [])
+
+
+def make_highlights(params: Params, rng: random.Random) -> dict[int, list[Highlight]]:
+    rows: dict[int, list[Highlight]] = {}
+    hl_id = 0
+    for guild_id in range(1, params.guilds + 1):
+        channels = [guild_id * 10_000 + c for c in range(params.channels)]
+        users = [guild_id * 10_000 + u for u in range(params.users)]
+        guild = rows[guild_id] = []
+        for user_id in users:
+            for _ in range(params.highlights):
+                hl_id += 1
+                hl = Highlight(id=hl_id, user_id=user_id, guild_id=guild_id, content="")
+                if rng.random() < params.regex_ratio:
+                    template = rng.choice(REGEX_TEMPLATES)
+                    hl.is_regex = True
+                    hl.content = template.format(
+                        *rng.sample(WORDS, template.count("{}"))
+                    )
+                else:
+                    hl.content = " ".join(rng.sample(WORDS, rng.choice((1, 1, 2))))
+
+                if rng.random() < params.list_ratio:
+                    hl.channel_list = rng.sample(channels, min(3, len(channels)))
+                    hl.channel_list_is_blacklist = rng.random() < 0.7
+                if rng.random() < params.list_ratio:
+                    hl.user_list = rng.sample(users, min(5, len(users)))
+                    hl.user_list_is_blacklist = rng.random() < 0.7
+                guild.append(hl)
+    return rows
+
+
+def make_messages(
+    params: Params, rng: random.Random
+) -> list[tuple[int, int, int, str]]:
+    # most chatter uses words nobody highlighted, like in a real guild
+    filler = [f"w{i}" for i in range(2_000)]
+    messages = []
+    for _ in range(params.messages):
+        guild_id = rng.randint(1, params.guilds)
+        channel_id = guild_id * 10_000 + rng.randrange(params.channels)
+        # some authors don't own any highlights
+        author_id = guild_id * 10_000 + rng.randrange(params.users * 2)
+        words = [
+            rng.choice(WORDS) if rng.random() < 0.02 else rng.choice(filler)
+            for _ in range(rng.randint(1, params.words))
+        ]
+        messages.append((guild_id, channel_id, author_id, " ".join(words)))
+    return messages
+
+
+async def replay(
+    messages: list[tuple[int, int, int, str]],
+) -> tuple[list[int], int]:
+    latencies = []
+    notifications = 0
+    for message in messages:
+        start = time.perf_counter_ns()
+        notifications += len(await highlights.find_notifications(*message))
+        latencies.append(time.perf_counter_ns() - start)
+    return latencies, notifications
+
+
+def reset_state(rows: dict[int, list[Highlight]], rest_latency: float) -> StubIndex:
+    async def has_permission(guild_id: int, user_id: int, channel_id: int) -> bool:
+        await asyncio.sleep(rest_latency)
+        return True
+
+    index = StubIndex(rows)
+    highlights.INDEX = index  # type: ignore[attr-defined]
+    highlights._has_permission = has_permission
+    highlights.PERMISSION_CACHE.clear()
+    highlights.ACTIVE_COOLDOWN.clear()
+    highlights.TRIGGER_COOLDOWN.clear()
+    return index
+
+
+async def run(params: Params) -> Results:
+    rng = random.Random(params.seed)
+    rows = make_highlights(params, rng)
+    messages = make_messages(params, rng)
+
+    # warm up, so guild loads and matcher builds aren't part of the timings
+    reset_state(rows, params.rest_latency)
+    await replay(messages[: len(messages) // 10])
+
+    index = reset_state(rows, params.rest_latency)
+    for guild_id in rows:
+        await index.get(guild_id)
+    start = time.perf_counter()
+    latencies, notifications = await replay(messages)
+    elapsed = time.perf_counter() - start
+
+    # allocations are measured in a separate pass, since tracing them is slow
+    index = reset_state(rows, params.rest_latency)
+    for guild_id in rows:
+        await index.get(guild_id)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    peak_total = 0
+    for message in messages:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        await highlights.find_notifications(*message)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return Results(
+        messages_per_second=len(messages) / elapsed,
+        p50_us=latencies[len(latencies) // 2] / 1_000,
+        p99_us=latencies[int(len(latencies) * 0.99)] / 1_000,
+        notifications=notifications,
+        peak_kib_per_message=peak_total / len(messages) / 1024,
+        retained_bytes_per_message=(after - before) / len(messages),
+    )
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200, help="per guild")
+    parser.add_argument("--highlights", type=int, default=10, help="per user")
+    parser.add_argument("--regex-ratio", type=float, default=0.2)
+    parser.add_argument("--list-ratio", type=float, default=0.2)
+    parser.add_argument("--channels", type=int, default=30, help="per guild")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--words", type=int, default=20, help="max per message")
+    parser.add_argument(
+        "--rest-latency", type=float, default=0.0, help="seconds per REST lookup"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare against a previous --json file")
+    args = parser.parse_args()
+
+    params = Params(
+        guilds=args.guilds,
+        users=args.users,
+        highlights=args.highlights,
+        regex_ratio=args.regex_ratio,
+        list_ratio=args.list_ratio,
+        channels=args.channels,
+        messages=args.messages,
+        words=args.words,
+        rest_latency=args.rest_latency,
+        seed=args.seed,
+    )
+    results = asyncio.run(run(params))
+    report = {"commit": git_commit(), "params": asdict(params), **asdict(results)}
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["params"] != report["params"]:
+            sys.exit("Can't compare runs with different parameters.")
+        old_commit = baseline["commit"] or "baseline"
+        new_commit = report["commit"] or "current"
+        print(f"{'':28}{old_commit:>12}{new_commit:>12}")
+        for key, value in asdict(results).items():
+            old = baseline[key]
+            change = f"{(value - old) / old:+.1%}" if old else ""
+            print(f"{key:28}{old:>12.2f}{value:>12.2f}  {change}")
+    else:
+        for key, value in asdict(results).items():
+            print(f"{key:28}{value:>12.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
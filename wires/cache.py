@@ -0,0 +1,121 @@
+import asyncio
+import time
+import typing as t
+from collections import OrderedDict
+
+K = t.TypeVar("K")
+V = t.TypeVar("V")
+
+
+class LRUCache(t.Generic[K, V]):
+    def __init__(self, max_size: int) -> None:
+        assert max_size > 0, "max_size must be positive"
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def get(self, key: K) -> V | None:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> V | None:
+        # like get(), but doesn't count towards stats or recency
+        return self._data.get(key)
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        if key in self._data:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class TTLCache(t.Generic[K, V]):
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: LRUCache[K, tuple[float, V]] = LRUCache(max_size)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.peek(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        self._entries.set(key, (time.monotonic() + self.ttl, value))
+
+    def discard(self, key: K) -> None:
+        self._entries.discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class CacheLoader(t.Generic[K, V]):
+    # fills an LRUCache on misses, with one load per key no matter how many
+    # tasks are waiting for it.
+    def __init__(
+        self, cache: LRUCache[K, V], load: t.Callable[[K], t.Awaitable[V]]
+    ) -> None:
+        self.cache = cache
+        self.load = load
+        self._loading: dict[K, asyncio.Task[V]] = {}
+
+    async def get(self, key: K) -> V:
+        if (value := self.cache.get(key)) is not None:
+            return value
+
+        if (task := self._loading.get(key)) is None:
+            task = self._loading[key] = asyncio.create_task(self._load(key))
+        return await asyncio.shield(task)
+
+    def forget(self, key: K) -> None:
+        # call this when the key is written to. a load that was started
+        # before the write may have read stale data, so its result is still
+        # handed to whoever awaited it but never stored.
+        if key in self._loading:
+            del self._loading[key]
+
+    def clear(self) -> None:
+        self._loading.clear()
+
+    async def _load(self, key: K) -> V:
+        this = asyncio.current_task()
+        try:
+            value = await self.load(key)
+        finally:
+            current = self._loading.get(key) is this
+            if current:
+                del self._loading[key]
+
+        if current:
+            self.cache.set(key, value)
+        return value
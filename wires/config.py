@@ -1,3 +1,4 @@
+import enum
 import os
 import typing as t
 from dataclasses import dataclass
@@ -6,16 +7,100 @@ import dotenv
 
 from wires.utils import unwrap
 
+T = t.TypeVar("T")
+
+
+def _env(name: str, cast: t.Callable[[str], T], default: T) -> T:
+    value = os.getenv(name)
+    return default if value is None else cast(value)
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+class CacheProfile(enum.Enum):
+    # everything hikari can cache
+    FULL = "full"
+    # only what wires reads: guilds, channels, roles and members
+    MINIMAL = "minimal"
+    # like MINIMAL, but members that highlights need are cached by the
+    # highlights plugin instead of hikari caching every member.
+    OWNERS = "owners"
+
 
 @dataclass
 class Config:
     token: str
     database_url: str | None = None
 
+    # used by the sharded launcher. None means the shard count discord
+    # recommends, and one process per CPU.
+    shard_count: int | None = None
+    shard_processes: int | None = None
+
+    cache_profile: CacheProfile = CacheProfile.FULL
+
+    # metrics are only recorded and served when a port is set. the sharded
+    # launcher gives each worker its own port, counting up from this one.
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int | None = None
+
+    # while the profiler is on (see /profiler), events slower than this many
+    # seconds are written to this file, which is rotated as it grows.
+    slow_event_threshold: float = 1.0
+    slow_event_file: str = "slow_events.jsonl"
+
+    # uvloop is only used when it's installed (poetry install -E uvloop)
+    uvloop: bool = False
+    # the event loop's stack is logged whenever it's blocked for this many
+    # seconds. 0 turns the watchdog off.
+    loop_watchdog_threshold: float = 1.0
+
+    # the defaults are asyncpg's own
+    database_pool_min_size: int = 10
+    database_pool_max_size: int = 10
+    database_statement_cache_size: int = 100
+    database_command_timeout: float | None = None
+    # asyncpg can't expire connections by age, so these two bound a
+    # connection's lifetime instead: it's replaced after this many queries,
+    # or after being idle for this many seconds.
+    database_max_queries: int = 50_000
+    database_max_inactive_lifetime: float = 300.0
+
+    def __post_init__(self) -> None:
+        if self.database_pool_min_size > self.database_pool_max_size:
+            raise ValueError(
+                "DATABASE_POOL_MIN_SIZE can't be larger than DATABASE_POOL_MAX_SIZE"
+            )
+
     @classmethod
     def load(cls) -> t.Self:
         dotenv.load_dotenv()
+        # the default min size follows a smaller max size
+        pool_max_size = _env("DATABASE_POOL_MAX_SIZE", int, 10)
         return cls(
             token=unwrap(os.getenv("TOKEN"), "no token"),
             database_url=os.getenv("DATABASE_URL"),
+            shard_count=_env("SHARD_COUNT", int, None),
+            shard_processes=_env("SHARD_PROCESSES", int, None),
+            cache_profile=_env("CACHE_PROFILE", CacheProfile, CacheProfile.FULL),
+            metrics_host=_env("METRICS_HOST", str, "127.0.0.1"),
+            metrics_port=_env("METRICS_PORT", int, None),
+            slow_event_threshold=_env("SLOW_EVENT_THRESHOLD", float, 1.0),
+            slow_event_file=_env("SLOW_EVENT_FILE", str, "slow_events.jsonl"),
+            uvloop=_env("UVLOOP", _flag, False),
+            loop_watchdog_threshold=_env("LOOP_WATCHDOG_THRESHOLD", float, 1.0),
+            database_pool_min_size=_env(
+                "DATABASE_POOL_MIN_SIZE", int, min(10, pool_max_size)
+            ),
+            database_pool_max_size=pool_max_size,
+            database_statement_cache_size=_env(
+                "DATABASE_STATEMENT_CACHE_SIZE", int, 100
+            ),
+            database_command_timeout=_env("DATABASE_COMMAND_TIMEOUT", float, None),
+            database_max_queries=_env("DATABASE_MAX_QUERIES", int, 50_000),
+            database_max_inactive_lifetime=_env(
+                "DATABASE_MAX_INACTIVE_LIFETIME", float, 300.0
+            ),
         )
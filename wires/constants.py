@@ -1,7 +1,33 @@
 # discord stuff
 EMBED_DARK_BG = 0x2B2D31
 MAX_MESSAGE_LENGTH = 4_000
+MAX_AUTOCOMPLETE_CHOICES = 25
 
 # limits
 MAX_HIGHLIGHT_LENGTH = 500
 MAX_HIGHLIGHTS_PER_USER = 24
+
+# caches
+MAX_CACHED_HIGHLIGHT_GUILDS = 10_000
+MAX_CACHED_HIGHLIGHT_VIEWS = 10_000
+MAX_CACHED_TICKET_CONFIG_GUILDS = 10_000
+MAX_CACHED_REGEXES = 5_000
+MAX_CACHED_CHANNELS_PER_GUILD = 512
+MAX_CACHED_PERMISSIONS = 50_000
+MAX_CACHED_THREAD_PARENTS = 50_000
+MAX_CACHED_DM_CHANNELS = 50_000
+MAX_KNOWN_GUILD_IDS = 100_000
+MAX_KNOWN_USER_IDS = 500_000
+PERMISSION_CACHE_TTL = 60
+MAX_CACHED_MEMBERS = 50_000
+MEMBER_CACHE_TTL = PERMISSION_CACHE_TTL
+MAX_TRIGGER_COOLDOWNS = 100_000
+MAX_ACTIVE_COOLDOWNS = 500_000
+
+# concurrency
+MAX_CONCURRENT_PERMISSION_CHECKS = 8
+MAX_PENDING_HIGHLIGHT_DMS = 10_000
+HIGHLIGHT_DM_WORKERS = 4
+HIGHLIGHT_DM_WINDOW = 5
+MAX_PENDING_TICKETS = 1_000
+TICKET_WORKERS = 4
@@ -0,0 +1,58 @@
+import time
+import typing as t
+from collections import OrderedDict
+from datetime import timedelta
+
+K = t.TypeVar("K")
+
+
+# A fixed-window cooldown per key, with a hard cap on how many keys are tracked.
+# Every window has the same length, so keeping keys ordered by when their window
+# started means expired windows are always at the front, and expiring them is
+# amortized O(1) without a background thread or sweep.
+class Cooldown(t.Generic[K]):
+    def __init__(self, capacity: int, period: timedelta, max_size: int) -> None:
+        self.capacity = capacity
+        self.period = period.total_seconds()
+        self.max_size = max_size
+        self.evictions = 0
+        # key -> (window start, triggers used)
+        self._windows: OrderedDict[K, tuple[float, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def can_trigger(self, key: K) -> bool:
+        window = self._windows.get(key)
+        if window is None or window[0] <= time.monotonic() - self.period:
+            return True
+        return window[1] < self.capacity
+
+    def trigger(self, key: K) -> timedelta | None:
+        now = time.monotonic()
+        self._expire(now)
+
+        if (window := self._windows.get(key)) is None:
+            self._windows[key] = (now, 1)
+            if len(self._windows) > self.max_size:
+                self._windows.popitem(last=False)
+                self.evictions += 1
+            return None
+
+        start, used = window
+        if used < self.capacity:
+            self._windows[key] = (start, used + 1)
+            return None
+        return timedelta(seconds=start + self.period - now)
+
+    def reset(self, key: K) -> None:
+        self._windows.pop(key, None)
+
+    def clear(self) -> None:
+        self._windows.clear()
+
+    def _expire(self, now: float) -> None:
+        deadline = now - self.period
+        windows = self._windows
+        while windows and windows[next(iter(windows))][0] <= deadline:
+            windows.popitem(last=False)
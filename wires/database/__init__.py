@@ -1,4 +1,4 @@
 from . import models
-from .database import Database
+from .database import Database, PoolStats
 
-__all__ = ("models", "Database")
+__all__ = ("models", "Database", "PoolStats")
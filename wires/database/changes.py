@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import typing as t
+from dataclasses import dataclass
+
+import asyncpg
+
+LOG = logging.getLogger(__name__)
+
+# the channel that the notify_change() trigger publishes to
+CHANNEL = "wires_changes"
+# custom setting that the trigger copies into each notification, so a
+# process can recognise (and skip) changes that it made itself
+ORIGIN_SETTING = "wires.origin"
+
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+
+
+@dataclass(frozen=True)
+class Change:
+    table: str
+    op: t.Literal["INSERT", "UPDATE", "DELETE"]
+    id: int
+    guild_id: int
+
+
+# called with None when notifications may have been missed (the listener
+# connection dropped), meaning everything cached from that table is suspect.
+ChangeCallback = t.Callable[[Change | None], None]
+
+
+class ChangeListener:
+    def __init__(self, dsn: str | None, origin: str) -> None:
+        self.dsn = dsn
+        self.origin = origin
+        self.received = 0
+        self._callbacks: dict[str, list[ChangeCallback]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def subscribe(self, table: str, callback: ChangeCallback) -> None:
+        self._callbacks.setdefault(table, []).append(callback)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                con = await asyncpg.connect(dsn=self.dsn)
+                closed = asyncio.Event()
+                con.add_termination_listener(lambda _: closed.set())
+                try:
+                    await con.add_listener(CHANNEL, self._on_notify)
+                    # anything could have changed while we weren't listening
+                    for callbacks in self._callbacks.values():
+                        for callback in callbacks:
+                            self._call(callback, None)
+                    delay = RECONNECT_DELAY
+                    await closed.wait()
+                finally:
+                    await con.close()
+            except Exception:
+                LOG.exception("Change listener failed")
+            else:
+                LOG.warning("Change listener connection closed")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _on_notify(self, con: object, pid: int, channel: str, payload: str) -> None:
+        data = json.loads(payload)
+        if data.pop("origin") == self.origin:
+            return
+
+        self.received += 1
+        change = Change(**data)
+        for callback in self._callbacks.get(change.table, ()):
+            self._call(callback, change)
+
+    def _call(self, callback: ChangeCallback, change: Change | None) -> None:
+        try:
+            callback(change)
+        except Exception:
+            LOG.exception("Change callback %s failed for %s", callback, change)
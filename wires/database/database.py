@@ -1,7 +1,89 @@
+import logging
+import secrets
+import time
+import typing as t
+from dataclasses import dataclass
+
+import asyncpg
+from apgorm import (
+    Connection,
+    FetchQueryBuilder,
+    Index,
+    LazyList,
+    Pool,
+    PoolAcquireContext,
+)
 from apgorm import Database as _Database
 
+from wires import metrics
+
+from .changes import ORIGIN_SETTING, ChangeCallback, ChangeListener
 from .models import Guild, Highlight, TicketConfig, User
 
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    size: int
+    idle: int
+    min_size: int
+    max_size: int
+    # tasks currently waiting for a connection
+    waiting: int
+    # totals since the pool was created
+    acquires: int
+    wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self.idle
+
+
+class _AcquireCounters:
+    __slots__ = ("waiting", "acquires", "wait_seconds", "max_wait_seconds")
+
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.acquires = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+
+class _TrackedAcquireContext(PoolAcquireContext):
+    __slots__ = ("counters",)
+
+    def __init__(
+        self, pac: asyncpg.pool.PoolAcquireContext, counters: _AcquireCounters
+    ) -> None:
+        super().__init__(pac)
+        self.counters = counters
+
+    async def __aenter__(self) -> Connection:
+        counters = self.counters
+        counters.waiting += 1
+        start = time.perf_counter()
+        try:
+            return await super().__aenter__()
+        finally:
+            waited = time.perf_counter() - start
+            counters.waiting -= 1
+            counters.acquires += 1
+            counters.wait_seconds += waited
+            counters.max_wait_seconds = max(counters.max_wait_seconds, waited)
+
+
+class _TrackedPool(Pool):
+    __slots__ = ("counters",)
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        super().__init__(pool)
+        self.counters = _AcquireCounters()
+
+    def acquire(self) -> PoolAcquireContext:
+        return _TrackedAcquireContext(self.pool.acquire(), self.counters)
+
 
 class Database(_Database):
     guilds = Guild
@@ -10,5 +92,119 @@ class Database(_Database):
     highlights = Highlight
     ticket_configs = TicketConfig
 
+    indexes = [
+        # covers lookups by guild_id alone (loading a guild's highlights) as
+        # well as by (user_id, guild_id) (the wizard and Highlight.count).
+        Index(Highlight, [Highlight.guild_id, Highlight.user_id]),
+    ]
+
     def __init__(self) -> None:
         super().__init__("wires/database/migrations")
+        # identifies this process in change notifications
+        self.origin = secrets.token_hex(8)
+        self.changes: ChangeListener | None = None
+
+    async def connect(self, **connect_kwargs: t.Any) -> None:
+        server_settings = connect_kwargs.pop("server_settings", {})
+        server_settings[ORIGIN_SETTING] = self.origin
+        self.pool = _TrackedPool(
+            await asyncpg.create_pool(
+                init=self._prepare_hot_queries,
+                server_settings=server_settings,
+                **connect_kwargs,
+            )
+        )
+        self.changes = ChangeListener(connect_kwargs.get("dsn"), self.origin)
+
+    async def cleanup(self, timeout: float = 30) -> None:
+        if self.changes is not None:
+            await self.changes.stop()
+        await super().cleanup(timeout)
+
+    async def execute(self, query: str, params: list[t.Any]) -> None:
+        with metrics.DB_QUERIES.time("execute", metrics.query_table(query)):
+            await super().execute(query, params)
+
+    async def fetchrow(
+        self, query: str, params: list[t.Any]
+    ) -> dict[str, t.Any] | None:
+        with metrics.DB_QUERIES.time("fetchrow", metrics.query_table(query)):
+            return await super().fetchrow(query, params)
+
+    async def fetchmany(
+        self, query: str, params: list[t.Any]
+    ) -> LazyList[asyncpg.Record, dict[str, t.Any]]:
+        with metrics.DB_QUERIES.time("fetchmany", metrics.query_table(query)):
+            return await super().fetchmany(query, params)
+
+    async def fetchval(self, query: str, params: list[t.Any]) -> t.Any:
+        with metrics.DB_QUERIES.time("fetchval", metrics.query_table(query)):
+            return await super().fetchval(query, params)
+
+    def on_change(self, table: str, callback: ChangeCallback) -> None:
+        # writes to `table` made by other processes are passed to callback.
+        assert self.changes
+        self.changes.subscribe(table, callback)
+
+    async def _prepare_hot_queries(self, con: asyncpg.Connection) -> None:
+        # asyncpg caches a prepared statement per connection for every query
+        # it runs, keyed by the SQL text. running the hot queries once when a
+        # connection opens means the first real lookup on it doesn't pay for
+        # parsing and planning.
+        for name, (query, count) in self.hot_queries().items():
+            sql, params = query._get_block(count=count).render()
+            try:
+                await con.fetch(sql, *params)
+            except asyncpg.PostgresError:
+                # e.g. the tables don't exist yet because we're connecting to
+                # apply the first migrations.
+                LOG.debug("Couldn't prepare %r", name, exc_info=True)
+
+    def pool_stats(self) -> PoolStats | None:
+        if not isinstance(self.pool, _TrackedPool):
+            return None
+
+        pool, counters = self.pool.pool, self.pool.counters
+        return PoolStats(
+            size=pool.get_size(),
+            idle=pool.get_idle_size(),
+            min_size=pool.get_min_size(),
+            max_size=pool.get_max_size(),
+            waiting=counters.waiting,
+            acquires=counters.acquires,
+            wait_seconds=counters.wait_seconds,
+            max_wait_seconds=counters.max_wait_seconds,
+        )
+
+    def hot_queries(self) -> dict[str, tuple[FetchQueryBuilder[t.Any], bool]]:
+        # name -> (query, whether it's a count)
+        return {
+            "highlights by guild": (Highlight.fetch_query().where(guild_id=0), False),
+            "highlights by user": (
+                Highlight.fetch_query().where(user_id=0, guild_id=0),
+                False,
+            ),
+            "highlight count by user": (
+                Highlight.fetch_query().where(user_id=0, guild_id=0),
+                True,
+            ),
+            "ticket configs by guild": (
+                TicketConfig.fetch_query().where(guild_id=0),
+                False,
+            ),
+            "ticket config by name": (
+                TicketConfig.fetch_query().where(guild_id=0, name=""),
+                False,
+            ),
+        }
+
+    async def explain(self, query: FetchQueryBuilder[t.Any], count: bool) -> str:
+        assert self.pool
+        sql, params = query._get_block(count=count).render()
+        async with self.pool.acquire() as con:
+            async with con.transaction():
+                # postgres prefers sequential scans on small tables, but we only
+                # want to know whether an index *can* serve the query.
+                await con.execute("SET LOCAL enable_seqscan = off")
+                rows = await con.fetchmany(f"EXPLAIN {sql}", params)
+        return "\n".join(row["QUERY PLAN"] for row in rows)
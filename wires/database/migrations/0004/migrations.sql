@@ -0,0 +1 @@
+CREATE INDEX _btree_index_highlights__guild_id_user_id ON highlights USING BTREE ( ( guild_id ) , ( user_id ) );
\ No newline at end of file
@@ -0,0 +1,21 @@
+CREATE FUNCTION notify_change() RETURNS trigger AS $$
+DECLARE
+    changed RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    PERFORM pg_notify('wires_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'id', changed.id,
+        'guild_id', changed.guild_id,
+        'origin', current_setting('wires.origin', true)
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER highlights_notify_change AFTER INSERT OR UPDATE OR DELETE ON highlights FOR EACH ROW EXECUTE FUNCTION notify_change();
+CREATE TRIGGER ticket_configs_notify_change AFTER INSERT OR UPDATE OR DELETE ON ticket_configs FOR EACH ROW EXECUTE FUNCTION notify_change();
\ No newline at end of file
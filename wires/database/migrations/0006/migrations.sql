@@ -0,0 +1,5 @@
+ALTER TABLE ticket_configs ADD COLUMN initial_message_user_mentions BIGINT[];
+ALTER TABLE ticket_configs ADD COLUMN initial_message_role_mentions BIGINT[];
+UPDATE ticket_configs SET initial_message_user_mentions = ARRAY(SELECT m[1]::BIGINT FROM regexp_matches(COALESCE(initial_message_content, ''), '<@(\d+)>', 'g') AS m), initial_message_role_mentions = ARRAY(SELECT m[1]::BIGINT FROM regexp_matches(COALESCE(initial_message_content, ''), '<@&(\d+)>', 'g') AS m);
+ALTER TABLE ticket_configs ALTER COLUMN initial_message_user_mentions SET NOT NULL;
+ALTER TABLE ticket_configs ALTER COLUMN initial_message_role_mentions SET NOT NULL;
\ No newline at end of file
@@ -1,7 +1,10 @@
 import enum
+import typing as t
 
 from apgorm import ForeignKey, Model, types
 
+from wires import metrics
+
 from .guild import Guild
 from .user import User
 
@@ -27,3 +30,64 @@ class Highlight(Model):
     user_list_is_blacklist = types.Boolean().field(default=True)
 
     primary_key = (id,)
+
+    # Each of these writes to a single highlight and returns it (None if it
+    # didn't exist) along with all of its owner's highlights in the guild,
+    # ordered by id, in one statement.
+
+    @classmethod
+    async def toggle(cls, id: int, field: str) -> tuple[t.Self | None, list[t.Self]]:
+        assert field in cls._all_fields
+        return await cls._write(
+            id, f"UPDATE {cls.tablename} SET {field} = NOT {field} WHERE id = $1", []
+        )
+
+    @classmethod
+    async def update(
+        cls, id: int, **values: t.Any
+    ) -> tuple[t.Self | None, list[t.Self]]:
+        assert values and all(field in cls._all_fields for field in values)
+        sets = ", ".join(f"{field} = ${i}" for i, field in enumerate(values, 2))
+        return await cls._write(
+            id,
+            f"UPDATE {cls.tablename} SET {sets} WHERE id = $1",
+            list(values.values()),
+        )
+
+    @classmethod
+    async def remove(cls, id: int) -> tuple[t.Self | None, list[t.Self]]:
+        # the deleted highlight isn't part of the returned list
+        return await cls._write(
+            id, f"DELETE FROM {cls.tablename} WHERE id = $1", [], listed=False
+        )
+
+    @classmethod
+    async def _write(
+        cls, id: int, write: str, params: list[t.Any], listed: bool = True
+    ) -> tuple[t.Self | None, list[t.Self]]:
+        # the outer SELECT sees the table as it was before the write, so the
+        # written row comes from RETURNING and the rest from the table.
+        query = (
+            f"WITH written AS ({write} RETURNING *) "
+            "SELECT * FROM written UNION ALL "
+            f"SELECT h.* FROM {cls.tablename} h JOIN written w "
+            "ON h.user_id = w.user_id AND h.guild_id = w.guild_id AND h.id <> w.id "
+            "ORDER BY id"
+        )
+        # a single statement is atomic by itself, so unlike Database.fetchmany
+        # this doesn't pay for a round-trip to BEGIN and COMMIT.
+        assert cls.database.pool
+        with metrics.DB_QUERIES.time("write", cls.tablename):
+            async with cls.database.pool.acquire() as con:
+                rows = await con.fetchmany(query, [id, *params])
+
+        written = None
+        highlights = []
+        for row in rows:
+            hl = cls._from_raw(**row)
+            if hl.id == id:
+                written = hl
+                if not listed:
+                    continue
+            highlights.append(hl)
+        return written, highlights
@@ -13,6 +13,13 @@ class TicketConfig(Model):
     channel = types.BigInt().field()
 
     initial_message_content = types.Text().nullablefield()
+    # parsed from initial_message_content whenever it's saved
+    initial_message_user_mentions = types.Array(types.BigInt()).field(
+        default_factory=list
+    )
+    initial_message_role_mentions = types.Array(types.BigInt()).field(
+        default_factory=list
+    )
 
     name_guild_uq = Unique(guild_id, name)
 
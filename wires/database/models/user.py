@@ -1,7 +1,12 @@
 import typing as t
 
 from apgorm import Model, types
-from asyncpg import UniqueViolationError
+
+from wires import constants
+from wires.cache import LRUCache
+
+# ids that are known to already have a row
+KNOWN_IDS: "LRUCache[int, bool]" = LRUCache(constants.MAX_KNOWN_USER_IDS)
 
 
 class User(Model):
@@ -11,7 +16,11 @@ class User(Model):
 
     @classmethod
     async def get_or_create(cls, id: int) -> t.Self:
-        try:
-            return await cls(id=id).create()
-        except UniqueViolationError:
-            return await cls.fetch(id=id)
+        if not KNOWN_IDS.get(id):
+            await cls.database.execute(
+                f"INSERT INTO {cls.tablename} (id) VALUES ($1) ON CONFLICT DO NOTHING",
+                [id],
+            )
+            KNOWN_IDS.set(id, True)
+        # the id is the only column, so there's nothing else to fetch
+        return cls._from_raw(id=id)
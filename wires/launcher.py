@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.queues
+import os
+import signal
+import time
+import types
+from dataclasses import dataclass, field
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+
+import hikari
+
+from wires.config import Config
+from wires.main import build_app, use_event_loop
+from wires.model import Model
+
+LOG = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s %(levelname)-8s %(processName)s %(name)s: %(message)s"
+# a worker that crashes is restarted after this many seconds, doubling each
+# time it crashes again before STABLE_AFTER seconds of uptime.
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+STABLE_AFTER = 600
+# how long to wait for a worker's shards to connect before starting the next
+# one. starting them one by one keeps identifies within discord's limits.
+READY_TIMEOUT = 600
+STOP_TIMEOUT = 60
+
+# workers are spawned rather than forked, so they don't inherit the
+# launcher's event loop or open sockets.
+_MP = multiprocessing.get_context("spawn")
+
+
+def split_shards(shard_count: int, processes: int) -> list[list[int]]:
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    groups = []
+    start = 0
+    for i in range(processes):
+        end = start + size + (i < extra)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+async def fetch_shard_count(token: str) -> int:
+    rest = hikari.RESTApp()
+    await rest.start()
+    try:
+        async with rest.acquire(token, hikari.TokenType.BOT) as client:
+            return (await client.fetch_gateway_bot_info()).shard_count
+    finally:
+        await rest.close()
+
+
+def run_worker(
+    index: int,
+    shard_ids: list[int],
+    shard_count: int,
+    logs: "multiprocessing.queues.Queue[logging.LogRecord]",
+    ready: Event,
+) -> None:
+    # hikari leaves logging alone when the root logger already has handlers,
+    # but it does turn off recording process names.
+    name = multiprocessing.current_process().name
+
+    def tag(record: logging.LogRecord) -> bool:
+        record.processName = name
+        return True
+
+    handler = logging.handlers.QueueHandler(logs)
+    handler.addFilter(tag)
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+
+    async def on_started(_: hikari.StartedEvent) -> None:
+        ready.set()
+
+    model = Model()
+    if model.config.metrics_port is not None:
+        model.config.metrics_port += index
+    use_event_loop(model.config)
+    app = build_app(model)
+    app.subscribe(hikari.StartedEvent, on_started)
+    try:
+        app.run(shard_ids=shard_ids, shard_count=shard_count)
+    except Exception:
+        LOG.exception("Worker crashed")
+        raise SystemExit(1)
+
+
+@dataclass
+class Worker:
+    index: int
+    name: str
+    shard_ids: list[int]
+    ready: Event = field(default_factory=_MP.Event)
+    process: SpawnProcess | None = None
+    started_at: float = 0.0
+    restart_at: float | None = None
+    restart_delay: float = RESTART_DELAY
+    restarts: int = 0
+
+
+class Launcher:
+    def __init__(self, shard_count: int, processes: int) -> None:
+        self.shard_count = shard_count
+        self.logs: "multiprocessing.queues.Queue[logging.LogRecord]" = _MP.Queue()
+        self.workers = [
+            Worker(i, f"shards-{ids[0]}-{ids[-1]}", ids)
+            for i, ids in enumerate(split_shards(shard_count, processes))
+        ]
+        self.stopping = False
+
+    def run(self) -> None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        listener = logging.handlers.QueueListener(self.logs, handler)
+        logging.basicConfig(level=logging.INFO, handlers=[handler])
+        listener.start()
+
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        try:
+            for worker in self.workers:
+                if self.stopping:
+                    break
+                self._start(worker)
+                self._wait_ready(worker)
+
+            while not self.stopping:
+                self._supervise()
+                time.sleep(1)
+        finally:
+            self._stop()
+            listener.stop()
+
+    def _on_signal(self, signum: int, frame: types.FrameType | None) -> None:
+        if self.stopping:
+            return
+        LOG.info("Received %s, stopping workers", signal.Signals(signum).name)
+        self.stopping = True
+
+    def _start(self, worker: Worker) -> None:
+        worker.ready.clear()
+        worker.process = _MP.Process(
+            target=run_worker,
+            args=(
+                worker.index,
+                worker.shard_ids,
+                self.shard_count,
+                self.logs,
+                worker.ready,
+            ),
+            name=worker.name,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        LOG.info("Started %s (pid %s)", worker.name, worker.process.pid)
+
+    def _wait_ready(self, worker: Worker) -> None:
+        assert worker.process
+        deadline = time.monotonic() + READY_TIMEOUT
+        while not worker.ready.wait(1):
+            if self.stopping or not worker.process.is_alive():
+                return
+            if time.monotonic() > deadline:
+                LOG.warning("%s still isn't ready, starting the next", worker.name)
+                return
+
+    def _supervise(self) -> None:
+        now = time.monotonic()
+        for worker in self.workers:
+            assert worker.process
+            if worker.process.is_alive():
+                continue
+
+            if worker.restart_at is None:
+                if now - worker.started_at > STABLE_AFTER:
+                    worker.restart_delay = RESTART_DELAY
+                LOG.error(
+                    "%s exited with code %s, restarting in %ss",
+                    worker.name,
+                    worker.process.exitcode,
+                    worker.restart_delay,
+                )
+                worker.restart_at = now + worker.restart_delay
+                worker.restart_delay = min(worker.restart_delay * 2, MAX_RESTART_DELAY)
+
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self._start(worker)
+
+    def _stop(self) -> None:
+        processes = [w.process for w in self.workers if w.process is not None]
+        for process in processes:
+            if process.is_alive():
+                # hikari closes its shards gracefully on SIGTERM
+                process.terminate()
+
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                LOG.warning("%s didn't stop in time, killing it", process.name)
+                process.kill()
+                process.join()
+
+
+def launch() -> None:
+    config = Config.load()
+    shard_count = config.shard_count or asyncio.run(fetch_shard_count(config.token))
+    processes = config.shard_processes or os.cpu_count() or 1
+    Launcher(shard_count, processes).run()
@@ -1,21 +1,54 @@
 import asyncio
+import logging
 import sys
 
 import crescent
 import flare
 import hikari
 
+from wires import metrics
+from wires.config import CacheProfile, Config
 from wires.database import Database
 from wires.model import Model
+from wires.profiler import PROFILER
+
+LOG = logging.getLogger(__name__)
 
 INTENTS = hikari.Intents.ALL_UNPRIVILEGED | hikari.Intents.MESSAGE_CONTENT
+MINIMAL_CACHE = (
+    hikari.api.CacheComponents.GUILDS
+    | hikari.api.CacheComponents.GUILD_CHANNELS
+    | hikari.api.CacheComponents.ROLES
+    | hikari.api.CacheComponents.MEMBERS
+    | hikari.api.CacheComponents.ME
+)
+CACHE_SETTINGS = {
+    CacheProfile.FULL: hikari.impl.CacheSettings(),
+    CacheProfile.MINIMAL: hikari.impl.CacheSettings(components=MINIMAL_CACHE),
+    CacheProfile.OWNERS: hikari.impl.CacheSettings(
+        components=MINIMAL_CACHE, only_my_member=True
+    ),
+}
 
 
-def run_app() -> None:
-    model = Model()
+def use_event_loop(config: Config) -> None:
+    # hikari.GatewayBot.run() and asyncio.run() both make their loop through
+    # the policy, so this has to happen before either.
+    if not config.uvloop:
+        return
+    try:
+        import uvloop
+    except ImportError:
+        LOG.warning("UVLOOP is set, but uvloop isn't installed.")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def build_app(model: Model) -> hikari.GatewayBot:
     app = hikari.GatewayBot(
         model.config.token,
         intents=INTENTS,
+        cache_settings=CACHE_SETTINGS[model.config.cache_profile],
         http_settings=hikari.impl.HTTPSettings(enable_cleanup_closed=False),
     )
     client = crescent.Client(app, model)
@@ -26,7 +59,25 @@ def run_app() -> None:
     app.subscribe(hikari.StartingEvent, model.up)
     app.subscribe(hikari.StoppedEvent, model.down)
 
-    app.run()
+    metrics.track_cache_sizes(app.cache)
+    PROFILER.configure(model.config.slow_event_threshold, model.config.slow_event_file)
+    app.subscribe(hikari.StartingEvent, PROFILER.install)
+    app.subscribe(hikari.StoppingEvent, PROFILER.uninstall)
+
+    if (port := model.config.metrics_port) is not None:
+        metrics.REGISTRY.enabled = True
+        metrics.instrument_rest()
+        server = metrics.MetricsServer(model.config.metrics_host, port)
+        app.subscribe(hikari.StartingEvent, server.start)
+        app.subscribe(hikari.StoppedEvent, server.stop)
+
+    return app
+
+
+def run_app() -> None:
+    model = Model()
+    use_event_loop(model.config)
+    build_app(model).run()
 
 
 def create_migrations() -> None:
@@ -38,6 +89,7 @@ def apply_migrations() -> None:
     model = Model()
     if model.config.database_url is None:
         raise ValueError("Can't apply migrations without DATABASE_URL")
+    use_event_loop(model.config)
 
     async def inner() -> None:
         await model.up()
@@ -46,3 +98,27 @@ def apply_migrations() -> None:
         await model.down()
 
     asyncio.run(inner())
+
+
+def check_indexes() -> None:
+    model = Model()
+    if model.config.database_url is None:
+        raise ValueError("Can't check indexes without DATABASE_URL")
+    use_event_loop(model.config)
+
+    async def inner() -> bool:
+        await model.up()
+        db = model.database
+        ok = True
+        for name, (query, count) in db.hot_queries().items():
+            plan = await db.explain(query, count)
+            if "Seq Scan" in plan:
+                ok = False
+                print(f"{name}: sequential scan\n{plan}\n")
+            else:
+                print(f"{name}: ok")
+        await model.down()
+        return ok
+
+    if not asyncio.run(inner()):
+        sys.exit(1)
@@ -0,0 +1,300 @@
+import asyncio
+import bisect
+import contextlib
+import logging
+import re
+import time
+import typing as t
+
+import hikari
+from aiohttp import web
+
+from wires import rest_hooks
+from wires.cache import LRUCache
+
+if t.TYPE_CHECKING:
+    from wires.database import Database
+
+LOG = logging.getLogger(__name__)
+T = t.TypeVar("T", int, float)
+
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+LOOP_LAG_INTERVAL = 0.5
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: t.Sequence[str], values: t.Sequence[str]) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class Registry:
+    def __init__(self) -> None:
+        # nothing is recorded until this is set, so instrumented code only
+        # pays for a perf_counter() call or two while metrics are off.
+        self.enabled = False
+        self.histograms: list[Histogram] = []
+        self.sizes: dict[str, t.Callable[[], int]] = {}
+        self.counts: dict[str, t.Callable[[], float]] = {}
+
+    def histogram(
+        self, name: str, help: str, labels: t.Sequence[str] = ()
+    ) -> "Histogram":
+        histogram = Histogram(self, name, help, tuple(labels))
+        self.histograms.append(histogram)
+        return histogram
+
+    def track_size(self, name: str, size: t.Callable[[], int]) -> None:
+        self.sizes[name] = size
+
+    def track_count(self, name: str, count: t.Callable[[], float]) -> None:
+        # for totals that the code keeps anyway, e.g. queue outcomes
+        self.counts[name] = count
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for histogram in self.histograms:
+            histogram.render(lines)
+
+        lines.append("# HELP wires_size Number of entries in a cache or queue.")
+        lines.append("# TYPE wires_size gauge")
+        for name, value in self.read_sizes().items():
+            lines.append(f'wires_size{{name="{_escape(name)}"}} {value}')
+
+        lines.append("# HELP wires_events_total Running totals of events or seconds.")
+        lines.append("# TYPE wires_events_total counter")
+        for name, total in self.read_counts().items():
+            lines.append(f'wires_events_total{{name="{_escape(name)}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def read_sizes(self) -> dict[str, int]:
+        return _read(self.sizes)
+
+    def read_counts(self) -> dict[str, float]:
+        return _read(self.counts)
+
+
+def _read(values: t.Mapping[str, t.Callable[[], T]]) -> dict[str, T]:
+    read: dict[str, T] = {}
+    for name, value in values.items():
+        try:
+            read[name] = value()
+        except Exception:
+            LOG.exception("Failed to read %s", name)
+    return read
+
+
+class _Series:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int) -> None:
+        # the last count is for values above every bucket
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_: object) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram:
+    def __init__(
+        self,
+        registry: Registry,
+        name: str,
+        help: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = BUCKETS,
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+
+        if (series := self._series.get(labels)) is None:
+            series = self._series[labels] = _Series(len(self.buckets))
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    def time(self, *labels: str) -> t.ContextManager[None]:
+        if not self.registry.enabled:
+            return contextlib.nullcontext()
+        return _Timer(self, labels)
+
+    def render(self, lines: list[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for values, series in self._series.items():
+            labels = _labels(self.labels, values)
+            prefix = f"{labels}," if labels else ""
+            total = 0
+            for bound, count in zip(self.buckets, series.counts):
+                total += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {total}')
+            total += series.counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series.sum}")
+            lines.append(f"{self.name}_count{suffix} {total}")
+
+
+class Stopwatch:
+    # times consecutive stages of one piece of work
+    __slots__ = ("histogram", "_last")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage)
+        self._last = now
+
+
+REGISTRY = Registry()
+
+ON_MESSAGE = REGISTRY.histogram(
+    "wires_on_message_seconds", "Time spent handling a guild message."
+)
+ON_MESSAGE_STAGES = REGISTRY.histogram(
+    "wires_on_message_stage_seconds",
+    "Time spent in each stage of handling a guild message.",
+    ["stage"],
+)
+DB_QUERIES = REGISTRY.histogram(
+    "wires_db_query_seconds",
+    "Database query latency, including waiting for a connection.",
+    ["operation", "table"],
+)
+REST_REQUESTS = REGISTRY.histogram(
+    "wires_rest_request_seconds",
+    "Discord REST latency, including waiting on rate limits.",
+    ["route"],
+)
+HIGHLIGHT_DMS = REGISTRY.histogram(
+    "wires_highlight_dm_seconds",
+    "Time between a highlight triggering and its DM being sent.",
+)
+TICKETS = REGISTRY.histogram(
+    "wires_ticket_seconds",
+    "Time between a ticket being requested and its thread being created.",
+)
+LOOP_LAG = REGISTRY.histogram(
+    "wires_event_loop_lag_seconds", "How late the event loop ran a timer."
+)
+
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+# query text -> table; apgorm renders the same few queries over and over
+_TABLES: LRUCache[str, str] = LRUCache(1_000)
+
+
+def query_table(query: str) -> str:
+    if (table := _TABLES.get(query)) is None:
+        match = _TABLE_RE.search(query)
+        table = match.group(1) if match else ""
+        _TABLES.set(query, table)
+    return table
+
+
+def instrument_rest() -> None:
+    rest_hooks.observe(_observe_rest)
+
+
+def _observe_rest(route: str, seconds: float) -> None:
+    REST_REQUESTS.observe(seconds, route)
+
+
+def track_cache_sizes(cache: hikari.api.Cache) -> None:
+    REGISTRY.track_size("hikari_guilds", lambda: len(cache.get_guilds_view()))
+    REGISTRY.track_size(
+        "hikari_guild_channels", lambda: len(cache.get_guild_channels_view())
+    )
+    REGISTRY.track_size("hikari_roles", lambda: len(cache.get_roles_view()))
+    REGISTRY.track_size(
+        "hikari_members",
+        lambda: sum(len(m) for m in cache.get_members_view().values()),
+    )
+    REGISTRY.track_size("hikari_messages", lambda: len(cache.get_messages_view()))
+
+
+def track_pool(database: "Database") -> None:
+    # registered once the pool exists, so the sizes are only ever read from a
+    # connected database.
+    def read(stat: str) -> t.Callable[[], t.Any]:
+        return lambda: getattr(database.pool_stats(), stat, 0)
+
+    for stat in ("size", "in_use", "idle", "waiting", "max_size"):
+        REGISTRY.track_size(f"db_pool_{stat}", read(stat))
+    REGISTRY.track_count("db_pool_acquires", read("acquires"))
+    REGISTRY.track_count("db_pool_wait_seconds", read("wait_seconds"))
+
+
+class MetricsServer:
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+        self._lag_task: asyncio.Task[None] | None = None
+
+    async def start(self, *_: object) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._lag_task = asyncio.create_task(self._measure_lag())
+        LOG.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self, *_: object) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _metrics(self, _: web.Request) -> web.Response:
+        return web.Response(
+            text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            LOOP_LAG.observe(max(0.0, loop.time() - start - LOOP_LAG_INTERVAL))
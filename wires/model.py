@@ -1,8 +1,9 @@
 import logging
 
-from wires import errors
+from wires import errors, metrics
 from wires.config import Config
 from wires.database import Database
+from wires.watchdog import Watchdog
 
 LOG = logging.getLogger(__name__)
 
@@ -11,6 +12,11 @@ class Model:
     def __init__(self) -> None:
         self.config = Config.load()
         self._database: Database | None = None
+        self.watchdog = (
+            Watchdog(self.config.loop_watchdog_threshold)
+            if self.config.loop_watchdog_threshold
+            else None
+        )
 
     @property
     def database(self) -> Database:
@@ -20,13 +26,27 @@ class Model:
         return self._database
 
     async def up(self, *_: object) -> None:
+        if self.watchdog:
+            self.watchdog.start()
+
         if not self.config.database_url:
             LOG.warning("Running bot in no-database mode.")
             return
 
         self._database = Database()
-        await self._database.connect(dsn=self.config.database_url)
+        await self._database.connect(
+            dsn=self.config.database_url,
+            min_size=self.config.database_pool_min_size,
+            max_size=self.config.database_pool_max_size,
+            statement_cache_size=self.config.database_statement_cache_size,
+            command_timeout=self.config.database_command_timeout,
+            max_queries=self.config.database_max_queries,
+            max_inactive_connection_lifetime=self.config.database_max_inactive_lifetime,
+        )
+        metrics.track_pool(self._database)
 
     async def down(self, *_: object) -> None:
         if self._database:
             await self._database.cleanup()
+        if self.watchdog:
+            await self.watchdog.stop()
@@ -1,12 +1,140 @@
+import asyncio
+import time
+import typing as t
+
 import crescent
+import hikari
+
+from wires import constants, errors, metrics
+from wires.database import Database
+from wires.profiler import PROFILER
 
 from . import Plugin
 
 plugin = Plugin()
 
+_owner_ids: set[int] | None = None
+
+
+async def is_owner(user_id: int) -> bool:
+    global _owner_ids
+    if _owner_ids is None:
+        application = await plugin.app.rest.fetch_application()
+        _owner_ids = {application.owner.id}
+        if application.team:
+            _owner_ids.update(application.team.members)
+    return user_id in _owner_ids
+
 
 @plugin.include
 @crescent.command(name="ping", description="Pong!")
 async def ping(ctx: crescent.Context) -> None:
     latency = int(plugin.app.heartbeat_latency * 1_000)
     await ctx.respond(f"Pong! {latency}ms")
+
+
+async def _loop_lag() -> float:
+    # how long a callback scheduled now waits behind everything else that's
+    # ready to run
+    loop = asyncio.get_running_loop()
+    ran: asyncio.Future[float] = loop.create_future()
+    start = time.perf_counter()
+    loop.call_soon(lambda: ran.set_result(time.perf_counter()))
+    return await ran - start
+
+
+async def _timed(coro: t.Awaitable[object]) -> str:
+    start = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        return f"failed ({type(e).__name__})"
+    return f"{(time.perf_counter() - start) * 1_000:.1f}ms"
+
+
+def _table(title: str, values: t.Mapping[str, float]) -> str:
+    if not values:
+        return ""
+    width = max(map(len, values), default=0)
+    rows = "\n".join(
+        f"{name:<{width}} {value:>12,.3f}"
+        if isinstance(value, float)
+        else f"{name:<{width}} {value:>12,}"
+        for name, value in values.items()
+    )
+    return f"**{title}**\n```\n{rows}\n```\n"
+
+
+async def _no_database() -> str:
+    return "no database"
+
+
+@plugin.include
+@crescent.command(
+    name="diagnostics",
+    description="Show latency and cache statistics.",
+    default_member_permissions=hikari.Permissions.ADMINISTRATOR,
+)
+async def diagnostics(ctx: crescent.Context) -> None:
+    if not await is_owner(ctx.user.id):
+        await ctx.respond("Only the bot's owners can use this.", ephemeral=True)
+        return
+
+    await ctx.defer(ephemeral=True)
+    lag = await _loop_lag()
+    try:
+        database: Database | None = plugin.model.database
+    except errors.NoDatabase:
+        database = None
+    rest, query = await asyncio.gather(
+        _timed(plugin.app.rest.fetch_my_user()),
+        _timed(database.fetchval("SELECT 1", [])) if database else _no_database(),
+    )
+
+    embed = hikari.Embed(title="Diagnostics", color=constants.EMBED_DARK_BG)
+    embed.add_field(
+        "Gateway", f"{plugin.app.heartbeat_latency * 1_000:.1f}ms", inline=True
+    )
+    embed.add_field("REST", rest, inline=True)
+    embed.add_field("Database", query, inline=True)
+    embed.add_field("Event loop lag", f"{lag * 1_000:.2f}ms", inline=True)
+    # hikari runs every event listener in its own task, so this is roughly the
+    # number of handlers in flight plus a few long-running background tasks.
+    embed.add_field("Tasks", str(len(asyncio.all_tasks())), inline=True)
+
+    if database and (stats := database.pool_stats()):
+        embed.add_field(
+            "Pool",
+            f"{stats.in_use}/{stats.size} in use (max {stats.max_size}), "
+            f"{stats.waiting} waiting, max wait {stats.max_wait_seconds * 1_000:.1f}ms",
+        )
+
+    embed.description = _table("Sizes", metrics.REGISTRY.read_sizes()) + _table(
+        "Totals", metrics.REGISTRY.read_counts()
+    )
+    await ctx.respond(embed=embed)
+
+
+@plugin.include
+@crescent.command(
+    name="profiler",
+    description="Toggle the slow event profiler.",
+    default_member_permissions=hikari.Permissions.ADMINISTRATOR,
+)
+async def profiler(ctx: crescent.Context) -> None:
+    if not await is_owner(ctx.user.id):
+        await ctx.respond("Only the bot's owners can use this.", ephemeral=True)
+        return
+
+    PROFILER.toggle()
+    if PROFILER.enabled:
+        await ctx.respond(
+            f"Profiler enabled. Events slower than {PROFILER.threshold}s are "
+            f"written to `{PROFILER.path}`.",
+            ephemeral=True,
+        )
+    else:
+        await ctx.respond(
+            f"Profiler disabled after writing {PROFILER.written} events.",
+            ephemeral=True,
+        )
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+import typing as t
+from dataclasses import dataclass, field
+
+import hikari
+
+from wires import constants, metrics
+from wires.cache import LRUCache
+from wires.utils import clip
+
+LOG = logging.getLogger(__name__)
+
+# discord's limits for a single message
+MAX_EMBEDS = 10
+MAX_EMBED_LENGTH = 6_000
+MAX_CONTENT_LENGTH = 2_000
+
+
+@dataclass
+class PendingDM:
+    queued_at: float
+    triggers: list[str] = field(default_factory=list)
+    embeds: list[hikari.Embed] = field(default_factory=list)
+
+
+def chunk_embeds(embeds: t.Sequence[hikari.Embed]) -> list[list[hikari.Embed]]:
+    chunks: list[list[hikari.Embed]] = []
+    length = 0
+    for embed in embeds:
+        size = embed.total_length()
+        if (
+            not chunks
+            or len(chunks[-1]) >= MAX_EMBEDS
+            or length + size > MAX_EMBED_LENGTH
+        ):
+            chunks.append([])
+            length = 0
+        chunks[-1].append(embed)
+        length += size
+    return chunks
+
+
+class DeliveryQueue:
+    def __init__(self, max_pending: int, workers: int, window: float) -> None:
+        self.max_pending = max_pending
+        self.workers = workers
+        # triggers for the same user within this many seconds share one DM
+        self.window = window
+
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._rest: hikari.api.RESTClient | None = None
+        self._pending: dict[int, PendingDM] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._dm_channels: LRUCache[int, int] = LRUCache(
+            constants.MAX_CACHED_DM_CHANNELS
+        )
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def start(self, rest: hikari.api.RESTClient) -> None:
+        self._rest = rest
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        self.dropped += len(self._pending)
+        self._pending.clear()
+        self._ready = asyncio.Queue()
+
+    def push(self, user_id: int, triggers: list[str], embed: hikari.Embed) -> None:
+        if (pending := self._pending.get(user_id)) is None:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+
+            pending = self._pending[user_id] = PendingDM(time.monotonic())
+            asyncio.get_running_loop().call_later(
+                self.window, self._ready.put_nowait, user_id
+            )
+
+        for trigger in triggers:
+            if trigger not in pending.triggers:
+                pending.triggers.append(trigger)
+        pending.embeds.append(embed)
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._ready.get()
+            if (pending := self._pending.pop(user_id, None)) is None:
+                continue
+
+            try:
+                await self._send(user_id, pending)
+            except asyncio.CancelledError:
+                raise
+            except hikari.ForbiddenError:
+                # the user has DMs disabled
+                self.failed += 1
+            except Exception:
+                self.failed += 1
+                LOG.exception("Failed to deliver highlights to %s", user_id)
+            else:
+                self.delivered += 1
+                metrics.HIGHLIGHT_DMS.observe(time.monotonic() - pending.queued_at)
+
+    async def _send(self, user_id: int, pending: PendingDM) -> None:
+        # hikari's REST client already waits on each route's rate limit
+        # bucket, so the number of workers is what bounds our request rate.
+        assert self._rest
+        if (channel_id := self._dm_channels.get(user_id)) is None:
+            channel_id = (await self._rest.create_dm_channel(user_id)).id
+            self._dm_channels.set(user_id, channel_id)
+
+        content = clip(
+            f"Highlights triggered: {', '.join(pending.triggers)}", MAX_CONTENT_LENGTH
+        )
+        try:
+            for i, embeds in enumerate(chunk_embeds(pending.embeds)):
+                await self._rest.create_message(
+                    channel_id, content if i == 0 else hikari.UNDEFINED, embeds=embeds
+                )
+        except hikari.NotFoundError:
+            self._dm_channels.discard(user_id)
+            raise
+
+
+DELIVERY = DeliveryQueue(
+    constants.MAX_PENDING_HIGHLIGHT_DMS,
+    constants.HIGHLIGHT_DM_WORKERS,
+    constants.HIGHLIGHT_DM_WINDOW,
+)
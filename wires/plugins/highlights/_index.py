@@ -0,0 +1,175 @@
+import typing as t
+from dataclasses import dataclass
+
+from wires import constants
+from wires.cache import CacheLoader, LRUCache
+from wires.database.models import Highlight
+
+from ._matcher import Matcher
+from ._regex import REGEX_CACHE
+
+
+@dataclass(frozen=True, slots=True)
+class ListFilter:
+    ids: frozenset[int]
+    is_blacklist: bool
+
+    @classmethod
+    def build(cls, ids: list[int], is_blacklist: bool) -> "ListFilter | None":
+        return cls(frozenset(ids), is_blacklist) if ids else None
+
+    def allows(self, id: int) -> bool:
+        return (id in self.ids) != self.is_blacklist
+
+
+class GuildHighlights:
+    # immutable; writes produce a new instance, so handlers that await while
+    # iterating over `highlights` never see it change underneath them.
+    __slots__ = (
+        "highlights",
+        "_matcher",
+        "_user_filters",
+        "_open",
+        "_channel_blacklists",
+        "_channel_whitelists",
+        "_channel_candidates",
+    )
+
+    def __init__(self, highlights: t.Iterable[Highlight]) -> None:
+        self.highlights = tuple(sorted(highlights, key=lambda hl: hl.id))
+        # built on first use, so a burst of writes only costs one rebuild.
+        self._matcher: Matcher | None = None
+
+        self._user_filters: dict[int, ListFilter] = {}
+        # channel id -> ids of the highlights that list it. highlights without
+        # a channel whitelist are "open" and apply unless blacklisted.
+        open_ids: set[int] = set()
+        self._channel_blacklists: dict[int, set[int]] = {}
+        self._channel_whitelists: dict[int, set[int]] = {}
+        for hl in self.highlights:
+            users = t.cast("list[int]", hl.user_list)
+            if f := ListFilter.build(users, hl.user_list_is_blacklist):
+                self._user_filters[hl.id] = f
+
+            channels = t.cast("list[int]", hl.channel_list)
+            if not channels or hl.channel_list_is_blacklist:
+                open_ids.add(hl.id)
+            lists = (
+                self._channel_blacklists
+                if hl.channel_list_is_blacklist
+                else self._channel_whitelists
+            )
+            for channel_id in channels:
+                lists.setdefault(channel_id, set()).add(hl.id)
+
+        self._open = frozenset(open_ids)
+        self._channel_candidates: LRUCache[int, frozenset[int]] = LRUCache(
+            constants.MAX_CACHED_CHANNELS_PER_GUILD
+        )
+
+    def __len__(self) -> int:
+        return len(self.highlights)
+
+    @property
+    def regex_count(self) -> int:
+        return self._matcher.regex_count if self._matcher else 0
+
+    @property
+    def regex_patterns(self) -> set[str]:
+        return {hl.content for hl in self.highlights if hl.is_regex}
+
+    def candidates(self, channel_id: int) -> frozenset[int] | None:
+        # None means that every highlight applies to this channel.
+        if not (self._channel_blacklists or self._channel_whitelists):
+            return None
+
+        if (ids := self._channel_candidates.get(channel_id)) is None:
+            ids = self._open.difference(
+                self._channel_blacklists.get(channel_id, ())
+            ).union(self._channel_whitelists.get(channel_id, ()))
+            self._channel_candidates.set(channel_id, ids)
+        return ids
+
+    def match(self, content: str, channel_id: int, author_id: int) -> list[Highlight]:
+        candidates = self.candidates(channel_id)
+        if candidates is not None and not candidates:
+            return []
+
+        if self._matcher is None:
+            self._matcher = Matcher(self.highlights)
+        if not (matched := self._matcher.match(content)):
+            return []
+        if candidates is not None:
+            matched.intersection_update(candidates)
+
+        return [
+            hl
+            for hl in self.highlights
+            if hl.id in matched
+            and hl.user_id != author_id
+            and ((f := self._user_filters.get(hl.id)) is None or f.allows(author_id))
+        ]
+
+    def with_highlight(self, highlight: Highlight) -> "GuildHighlights":
+        highlights = [hl for hl in self.highlights if hl.id != highlight.id]
+        highlights.append(highlight)
+        return GuildHighlights(highlights)
+
+    def without_highlight(self, highlight_id: int) -> "GuildHighlights":
+        return GuildHighlights(hl for hl in self.highlights if hl.id != highlight_id)
+
+
+class HighlightIndex:
+    def __init__(self, max_guilds: int) -> None:
+        self._guilds: LRUCache[int, GuildHighlights] = LRUCache(max_guilds)
+        self._loader = CacheLoader(self._guilds, self._load)
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    @property
+    def hits(self) -> int:
+        return self._guilds.hits
+
+    @property
+    def misses(self) -> int:
+        return self._guilds.misses
+
+    async def get(self, guild_id: int) -> GuildHighlights:
+        return await self._loader.get(guild_id)
+
+    def upsert(self, highlight: Highlight) -> None:
+        self._loader.forget(highlight.guild_id)
+        if (guild := self._guilds.peek(highlight.guild_id)) is not None:
+            self._replace(highlight.guild_id, guild, guild.with_highlight(highlight))
+
+    def remove(self, guild_id: int, highlight_id: int) -> None:
+        self._loader.forget(guild_id)
+        if (guild := self._guilds.peek(guild_id)) is not None:
+            self._replace(guild_id, guild, guild.without_highlight(highlight_id))
+
+    def invalidate(self, guild_id: int) -> None:
+        self._loader.forget(guild_id)
+        self._guilds.discard(guild_id)
+
+    def clear(self) -> None:
+        self._loader.clear()
+        self._guilds.clear()
+
+    def _replace(
+        self, guild_id: int, old: GuildHighlights, new: GuildHighlights
+    ) -> None:
+        # an edit, a regex toggle or a delete can leave a pattern unused.
+        # another guild may still use it, in which case it's just recompiled.
+        for pattern in old.regex_patterns - new.regex_patterns:
+            REGEX_CACHE.discard(pattern)
+        self._guilds.set(guild_id, new)
+
+    async def _load(self, guild_id: int) -> GuildHighlights:
+        return GuildHighlights(await self._fetch(guild_id))
+
+    async def _fetch(self, guild_id: int) -> t.Iterable[Highlight]:
+        return await Highlight.fetchmany(guild_id=guild_id)
+
+
+INDEX = HighlightIndex(constants.MAX_CACHED_HIGHLIGHT_GUILDS)
@@ -0,0 +1,68 @@
+import typing as t
+
+from regex_rs import Regex
+
+from wires.database.models import Highlight
+
+from ._regex import REGEX_CACHE
+
+_META = frozenset("\\.+*?()|[]{}^$#&-~")
+
+
+def escape(literal: str) -> str:
+    return "".join(f"\\{c}" if c in _META else c for c in literal)
+
+
+def _gate(patterns: t.Iterable[str]) -> Regex | None:
+    # regex_rs doesn't expose a RegexSet, but it runs an alternation as a
+    # single automaton pass, which is enough to tell whether *anything* in
+    # the guild matched. only messages that pass the gate pay for finding
+    # out which highlights it was.
+    try:
+        return Regex("|".join(f"(?:{p})" for p in patterns))
+    except ValueError:
+        # e.g. two regexes with the same group name; fall back to checking
+        # every pattern.
+        return None
+
+
+class Matcher:
+    __slots__ = ("_literals", "_regexes", "_literal_gate", "_regex_gate")
+
+    def __init__(self, highlights: t.Iterable[Highlight]) -> None:
+        # highlights are grouped by pattern, since many users tend to
+        # highlight the same words.
+        self._literals: dict[str, list[int]] = {}
+        self._regexes: dict[str, tuple[Regex, list[int]]] = {}
+        for hl in highlights:
+            if not hl.is_regex:
+                self._literals.setdefault(hl.content, []).append(hl.id)
+            elif (re := REGEX_CACHE.get(hl.content)) is not None:
+                self._regexes.setdefault(hl.content, (re, []))[1].append(hl.id)
+
+        self._literal_gate = _gate(map(escape, self._literals))
+        self._regex_gate = _gate(self._regexes)
+
+    @property
+    def regex_count(self) -> int:
+        return len(self._regexes)
+
+    def match(self, content: str) -> set[int]:
+        matched: set[int] = set()
+
+        if self._literals:
+            lowercase = content.lower()
+            gate = self._literal_gate
+            if gate is None or gate.is_match(content) or gate.is_match(lowercase):
+                for literal, ids in self._literals.items():
+                    if literal in content or literal in lowercase:
+                        matched.update(ids)
+
+        if self._regexes:
+            gate = self._regex_gate
+            if gate is None or gate.is_match(content):
+                for re, ids in self._regexes.values():
+                    if re.is_match(content):
+                        matched.update(ids)
+
+        return matched
@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+
+# channel id -> (expiry, whether the user can view the channel)
+_Channels = dict[int, tuple[float, bool]]
+
+
+class PermissionCache:
+    # guild -> user -> channel, so that a role or channel update drops one
+    # guild's entries without looking at anyone else's.
+    # when there are too many entries, the least recently used guilds are
+    # dropped as a whole.
+    def __init__(self, max_size: int, ttl: float) -> None:
+        assert max_size > 0, "max_size must be positive"
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._guilds: OrderedDict[int, dict[int, _Channels]] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, guild_id: int, user_id: int, channel_id: int) -> bool | None:
+        if (users := self._guilds.get(guild_id)) is not None:
+            self._guilds.move_to_end(guild_id)
+            channels = users.get(user_id)
+            if channels and (entry := channels.get(channel_id)):
+                if entry[0] >= time.monotonic():
+                    self.hits += 1
+                    return entry[1]
+
+                del channels[channel_id]
+                self._size -= 1
+
+        self.misses += 1
+        return None
+
+    def set(self, guild_id: int, user_id: int, channel_id: int, value: bool) -> None:
+        if (users := self._guilds.get(guild_id)) is None:
+            users = self._guilds[guild_id] = {}
+        self._guilds.move_to_end(guild_id)
+
+        channels = users.setdefault(user_id, {})
+        if channel_id not in channels:
+            self._size += 1
+        channels[channel_id] = (time.monotonic() + self.ttl, value)
+
+        while self._size > self.max_size:
+            _, users = self._guilds.popitem(last=False)
+            self._size -= _count(users)
+
+    def discard_guild(self, guild_id: int) -> None:
+        if (users := self._guilds.pop(guild_id, None)) is not None:
+            self._size -= _count(users)
+
+    def clear(self) -> None:
+        self._guilds.clear()
+        self._size = 0
+
+
+def _count(users: dict[int, _Channels]) -> int:
+    return sum(map(len, users.values()))
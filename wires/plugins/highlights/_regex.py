@@ -0,0 +1,46 @@
+from regex_rs import Regex
+
+from wires import constants
+from wires.cache import LRUCache
+
+
+class RegexCache:
+    def __init__(self, max_size: int) -> None:
+        # invalid patterns are stored as their error message, so they aren't
+        # recompiled (and don't fail again) on every message.
+        self._patterns: LRUCache[str, Regex | str] = LRUCache(max_size)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def hits(self) -> int:
+        return self._patterns.hits
+
+    @property
+    def misses(self) -> int:
+        return self._patterns.misses
+
+    def get(self, pattern: str) -> Regex | None:
+        compiled = self._compile(pattern)
+        return None if isinstance(compiled, str) else compiled
+
+    def error(self, pattern: str) -> str | None:
+        compiled = self._compile(pattern)
+        return compiled if isinstance(compiled, str) else None
+
+    def discard(self, pattern: str) -> None:
+        self._patterns.discard(pattern)
+
+    def _compile(self, pattern: str) -> Regex | str:
+        compiled = self._patterns.get(pattern)
+        if compiled is None:
+            try:
+                compiled = Regex(pattern)
+            except ValueError as e:
+                compiled = str(e.args[0])
+            self._patterns.set(pattern, compiled)
+        return compiled
+
+
+REGEX_CACHE = RegexCache(constants.MAX_CACHED_REGEXES)
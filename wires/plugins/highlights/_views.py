@@ -0,0 +1,55 @@
+import itertools
+import typing as t
+
+from wires import constants
+from wires.cache import LRUCache
+
+# (user, guild, current highlight, guild version)
+ViewKey = tuple[int, int, int | None, int]
+
+
+class ViewCache:
+    # rendered wizard messages. instead of finding every view that a write
+    # affects, writes give the guild a new version, so views rendered before
+    # the write are never looked up again and age out of the LRU.
+    def __init__(self, max_size: int, max_guilds: int) -> None:
+        self._views: LRUCache[ViewKey, dict[str, t.Any]] = LRUCache(max_size)
+        self._versions: LRUCache[int, int] = LRUCache(max_guilds)
+        # versions are never reused, so a guild whose version was evicted
+        # can't be handed one that old views were stored under.
+        self._clock = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    @property
+    def hits(self) -> int:
+        return self._views.hits
+
+    @property
+    def misses(self) -> int:
+        return self._views.misses
+
+    def version(self, guild_id: int) -> int:
+        if (version := self._versions.get(guild_id)) is None:
+            version = next(self._clock)
+            self._versions.set(guild_id, version)
+        return version
+
+    def get(self, key: ViewKey) -> dict[str, t.Any] | None:
+        return self._views.get(key)
+
+    def set(self, key: ViewKey, view: dict[str, t.Any]) -> None:
+        self._views.set(key, view)
+
+    def invalidate(self, guild_id: int) -> None:
+        self._versions.set(guild_id, next(self._clock))
+
+    def clear(self) -> None:
+        self._versions.clear()
+        self._views.clear()
+
+
+VIEWS = ViewCache(
+    constants.MAX_CACHED_HIGHLIGHT_VIEWS, constants.MAX_CACHED_HIGHLIGHT_GUILDS
+)
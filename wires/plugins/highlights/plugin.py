@@ -1,49 +1,129 @@
+import asyncio
 import logging
+import time
 from datetime import timedelta
 
 import crescent
 import hikari
-import regex_rs
 import toolbox
-from floodgate import FixedMapping
 
+from wires import constants, metrics
+from wires.cache import LRUCache, TTLCache
+from wires.config import CacheProfile
+from wires.cooldown import Cooldown
+from wires.database.changes import Change
 from wires.database.models import Highlight
+from wires.profiler import PROFILER
 from wires.utils import clip, unwrap
 
 from .. import Plugin
+from ._delivery import DELIVERY
+from ._index import INDEX
+from ._permissions import PermissionCache
+from ._regex import REGEX_CACHE
+from ._views import VIEWS
 
 plugin = Plugin()
 
 LOG = logging.getLogger(__file__)
 
-TRIGGER_COOLDOWN: "FixedMapping[int]" = FixedMapping(3, timedelta(minutes=10))
-ACTIVE_COOLDOWN: "FixedMapping[tuple[int, int]]" = FixedMapping(1, timedelta(minutes=5))
+TRIGGER_COOLDOWN: "Cooldown[int]" = Cooldown(
+    3, timedelta(minutes=10), constants.MAX_TRIGGER_COOLDOWNS
+)
+ACTIVE_COOLDOWN: "Cooldown[tuple[int, int]]" = Cooldown(
+    1, timedelta(minutes=5), constants.MAX_ACTIVE_COOLDOWNS
+)
+
+# role and channel updates clear a guild's entries. member updates need the
+# privileged GUILD_MEMBERS intent, which wires doesn't request, so a member's
+# own role changes (or leaving) are only picked up when their entries expire.
+PERMISSION_CACHE = PermissionCache(
+    constants.MAX_CACHED_PERMISSIONS, constants.PERMISSION_CACHE_TTL
+)
+# with the "owners" cache profile, hikari only caches the bot's own member, so
+# fetched members are kept here instead. nothing tells us when they change,
+# so they expire along with the permissions computed from them.
+MEMBERS: "TTLCache[tuple[int, int], hikari.Member]" = TTLCache(
+    constants.MAX_CACHED_MEMBERS, constants.MEMBER_CACHE_TTL
+)
+# thread id -> parent channel id
+THREAD_PARENTS: "LRUCache[int, int]" = LRUCache(constants.MAX_CACHED_THREAD_PARENTS)
+PERMISSION_CHECKS = asyncio.Semaphore(constants.MAX_CONCURRENT_PERMISSION_CHECKS)
+
+for name, size in {
+    "highlight_index": INDEX.__len__,
+    "highlight_regexes": REGEX_CACHE.__len__,
+    "highlight_views": VIEWS.__len__,
+    "highlight_permissions": PERMISSION_CACHE.__len__,
+    "highlight_members": MEMBERS.__len__,
+    "highlight_thread_parents": THREAD_PARENTS.__len__,
+    "highlight_trigger_cooldowns": TRIGGER_COOLDOWN.__len__,
+    "highlight_active_cooldowns": ACTIVE_COOLDOWN.__len__,
+    "highlight_dm_queue": lambda: DELIVERY.depth,
+}.items():
+    metrics.REGISTRY.track_size(name, size)
+for name, count in {
+    "highlight_dms_delivered": lambda: DELIVERY.delivered,
+    "highlight_dms_dropped": lambda: DELIVERY.dropped,
+    "highlight_dms_failed": lambda: DELIVERY.failed,
+    "highlight_index_hits": lambda: INDEX.hits,
+    "highlight_index_misses": lambda: INDEX.misses,
+    "highlight_regex_hits": lambda: REGEX_CACHE.hits,
+    "highlight_regex_misses": lambda: REGEX_CACHE.misses,
+    "highlight_view_hits": lambda: VIEWS.hits,
+    "highlight_view_misses": lambda: VIEWS.misses,
+    "highlight_permission_hits": lambda: PERMISSION_CACHE.hits,
+    "highlight_permission_misses": lambda: PERMISSION_CACHE.misses,
+    "highlight_member_hits": lambda: MEMBERS.hits,
+    "highlight_member_misses": lambda: MEMBERS.misses,
+}.items():
+    metrics.REGISTRY.track_count(name, count)
 
 
 async def has_permission(guild_id: int, user_id: int, channel_id: int) -> bool:
+    if (allowed := PERMISSION_CACHE.get(guild_id, user_id, channel_id)) is None:
+        async with PERMISSION_CHECKS:
+            allowed = await _has_permission(guild_id, user_id, channel_id)
+        PERMISSION_CACHE.set(guild_id, user_id, channel_id, allowed)
+    return allowed
+
+
+async def _has_permission(guild_id: int, user_id: int, channel_id: int) -> bool:
+    cache_members = plugin.model.config.cache_profile is CacheProfile.OWNERS
     member = plugin.app.cache.get_member(guild_id, user_id)
+    if not member and cache_members:
+        member = MEMBERS.get((guild_id, user_id))
     if not member:
         try:
             member = await plugin.app.rest.fetch_member(guild_id, user_id)
         except hikari.NotFoundError:
             return False
+        if cache_members:
+            MEMBERS.set((guild_id, user_id), member)
 
     channel = plugin.app.cache.get_guild_channel(channel_id)
     if not channel:
         # must be a thread, because hikari caches all other channel types
         # entirely.
-        thread = plugin.app.rest.fetch_channel(channel_id)
+        if (parent_id := THREAD_PARENTS.get(channel_id)) is not None:
+            return await _has_permission(guild_id, user_id, parent_id)
+
+        try:
+            thread = await plugin.app.rest.fetch_channel(channel_id)
+        except (hikari.NotFoundError, hikari.ForbiddenError):
+            return False
 
         if isinstance(thread, hikari.GuildThreadChannel):
-            return await has_permission(guild_id, user_id, thread.parent_id)
+            THREAD_PARENTS.set(thread.id, thread.parent_id)
+            return await _has_permission(guild_id, user_id, thread.parent_id)
 
         elif isinstance(thread, hikari.PermissibleGuildChannel):
-            LOG.error("Non-thread channel was not cached. {}", thread)
+            LOG.error("Non-thread channel was not cached. %s", thread)
             # we can still use it though
             channel = thread
 
         else:
-            LOG.error("Non-thread channel was non-permissible.", thread)
+            LOG.error("Non-thread channel was non-permissible. %s", thread)
             # nothing we can do at this point
             return False
 
@@ -51,79 +131,146 @@ async def has_permission(guild_id: int, user_id: int, channel_id: int) -> bool:
     return hikari.Permissions.VIEW_CHANNEL in permissions
 
 
-@plugin.include
-@crescent.event
-async def on_message(event: hikari.GuildMessageCreateEvent) -> None:
-    active_key = (event.author_id, event.channel_id)
+def build_embed(event: hikari.GuildMessageCreateEvent) -> hikari.Embed:
+    guild = unwrap(event.get_guild())
+    footer = guild.name
+    if (channel := event.get_channel()) and channel.name:
+        footer += f" | {channel.name}"
+    return (
+        hikari.Embed(
+            title="Jump",
+            description=event.content,
+            url=event.message.make_link(event.guild_id),
+        )
+        .set_footer(footer, icon=guild.icon_url)
+        .set_author(name=event.author.username, icon=event.author.avatar_url)
+    )
+
+
+async def find_notifications(
+    guild_id: int, channel_id: int, author_id: int, content: str
+) -> dict[int, list[str]]:
+    active_key = (author_id, channel_id)
     ACTIVE_COOLDOWN.reset(active_key)
     ret = ACTIVE_COOLDOWN.trigger(active_key)
     assert ret is None, "reset failed"
 
-    if not event.content:
-        return
-    lowercase_content = event.content.lower()
+    if not content:
+        return {}
+    watch = metrics.Stopwatch(metrics.ON_MESSAGE_STAGES)
+    guild = await INDEX.get(guild_id)
+    watch.lap("fetch")
+    if not guild:
+        return {}
+
+    triggered: list[Highlight] = []
+    for hl in guild.match(content, channel_id, author_id):
+        if not ACTIVE_COOLDOWN.can_trigger((hl.user_id, channel_id)):
+            continue
+        if TRIGGER_COOLDOWN.trigger(hl.id):
+            continue
 
-    highlights = (
-        await Highlight.fetch_query()
-        .where(guild_id=event.guild_id)
-        .where(Highlight.user_id.neq(event.author_id))
-        .fetchmany()
+        triggered.append(hl)
+    watch.lap("match")
+    PROFILER.note("regexes", guild.regex_count)
+    if not triggered:
+        return {}
+    PROFILER.note("highlight_ids", [hl.id for hl in triggered])
+
+    users = list({hl.user_id for hl in triggered})
+    allowed = await asyncio.gather(
+        *(has_permission(guild_id, u, channel_id) for u in users)
     )
+    can_view = {u for u, ok in zip(users, allowed) if ok}
+    watch.lap("permission")
+
     notifications: dict[int, list[str]] = {}
+    for hl in triggered:
+        if hl.user_id in can_view:
+            notifications.setdefault(hl.user_id, []).append(clip(hl.content, 12))
+    return notifications
 
-    for hl in highlights:
-        if hl.channel_list:
-            is_in = event.channel_id in hl.channel_list
 
-            if hl.channel_list_is_blacklist and is_in:
-                continue
-            elif not hl.channel_list_is_blacklist and not is_in:
-                continue
+@plugin.include
+@crescent.event
+async def on_message(event: hikari.GuildMessageCreateEvent) -> None:
+    # bots and webhooks can't own highlights, and shouldn't trigger them
+    if not event.is_human:
+        return
 
-        if hl.user_list:
-            is_in = event.author_id in hl.user_list
+    start = time.perf_counter()
+    with PROFILER.trace("on_message"):
+        notifications = await find_notifications(
+            event.guild_id, event.channel_id, event.author_id, event.content or ""
+        )
+        if notifications:
+            delivery = time.perf_counter()
+            embed = build_embed(event)
+            for user, triggers in notifications.items():
+                DELIVERY.push(user, triggers, embed)
+            metrics.ON_MESSAGE_STAGES.observe(
+                time.perf_counter() - delivery, "delivery"
+            )
+    metrics.ON_MESSAGE.observe(time.perf_counter() - start)
 
-            if hl.user_list_is_blacklist and is_in:
-                continue
-            elif not hl.user_list_is_blacklist and not is_in:
-                continue
 
-        if hl.is_regex:
-            try:
-                re = regex_rs.Regex(hl.content)
-            except ValueError:
-                continue
+@plugin.include
+@crescent.event
+async def on_started(_: hikari.StartedEvent) -> None:
+    DELIVERY.start(plugin.app.rest)
+    if plugin.model.config.database_url:
+        plugin.model.database.on_change("highlights", on_highlight_change)
 
-            if not re.is_match(event.content):
-                continue
-        else:
-            if hl.content not in event.content and hl.content not in lowercase_content:
-                continue
 
-        if not ACTIVE_COOLDOWN.can_trigger((hl.user_id, event.channel_id)):
-            continue
-        if TRIGGER_COOLDOWN.trigger(hl.id):
-            continue
+def on_highlight_change(change: Change | None) -> None:
+    if change is None:
+        INDEX.clear()
+        VIEWS.clear()
+    else:
+        INDEX.invalidate(change.guild_id)
+        VIEWS.invalidate(change.guild_id)
 
-        if not await has_permission(event.guild_id, hl.user_id, event.channel_id):
-            continue
 
-        notifications.setdefault(hl.user_id, []).append(clip(hl.content, 12))
+@plugin.include
+@crescent.event
+async def on_stopping(_: hikari.StoppingEvent) -> None:
+    await DELIVERY.stop()
+
+
+@plugin.include
+@crescent.event
+async def on_role_event(event: hikari.RoleEvent) -> None:
+    PERMISSION_CACHE.discard_guild(event.guild_id)
 
-    guild = unwrap(event.get_guild())
-    footer = guild.name
-    if (source_channel := event.get_channel()) and source_channel.name:
-        footer += f" | {source_channel.name}"
-    embed = (
-        hikari.Embed(
-            title="Jump",
-            description=event.content,
-            url=event.message.make_link(event.guild_id),
-        )
-        .set_footer(footer, icon=guild.icon_url)
-        .set_author(name=event.author.username, icon=event.author.avatar_url)
-    )
 
-    for user, triggers in notifications.items():
-        channel = await plugin.app.rest.create_dm_channel(user)
-        await channel.send(f"Highlights triggered: {', '.join(triggers)}", embed=embed)
+@plugin.include
+@crescent.event
+async def on_channel_update(event: hikari.GuildChannelUpdateEvent) -> None:
+    # overwrites on a channel also apply to its threads, which are cached under
+    # their own ids, so drop the whole guild.
+    PERMISSION_CACHE.discard_guild(event.guild_id)
+
+
+@plugin.include
+@crescent.event
+async def on_thread_create(event: hikari.GuildThreadCreateEvent) -> None:
+    THREAD_PARENTS.set(event.thread.id, event.thread.parent_id)
+
+
+@plugin.include
+@crescent.event
+async def on_thread_update(event: hikari.GuildThreadUpdateEvent) -> None:
+    THREAD_PARENTS.set(event.thread.id, event.thread.parent_id)
+
+
+@plugin.include
+@crescent.event
+async def on_thread_delete(event: hikari.GuildThreadDeleteEvent) -> None:
+    THREAD_PARENTS.discard(event.thread_id)
+
+
+@plugin.include
+@crescent.event
+async def on_thread_list_sync(event: hikari.ThreadListSyncEvent) -> None:
+    for thread in event.threads.values():
+        THREAD_PARENTS.set(thread.id, thread.parent_id)
@@ -4,13 +4,16 @@ import typing as t
 import crescent
 import flare
 import hikari
-from regex_rs import Regex
 
 from wires import constants
 from wires.database.models import Guild, Highlight, User
+from wires.profiler import PROFILER
 from wires.utils import clip, unwrap
 
 from .. import Plugin
+from ._index import INDEX
+from ._regex import REGEX_CACHE
+from ._views import VIEWS
 
 plugin = Plugin()
 
@@ -21,48 +24,44 @@ plugin = Plugin()
     description="View and manage your highlights.",
     dm_enabled=False,
 )
+@PROFILER.traced
 async def _(ctx: crescent.Context) -> None:
     assert ctx.guild_id
     await ctx.respond(
-        **await highlight_view_msg(ctx.user.id, ctx.guild_id, None, None),
+        **await highlight_view_msg(ctx.user.id, ctx.guild_id, None),
         ephemeral=True,
     )
 
 
 async def highlight_view_msg(
-    user_id: int | None,
-    guild_id: int | None,
+    user_id: int,
+    guild_id: int,
     current: int | None,
-    message: hikari.Message | None,
+    highlights: t.Sequence[Highlight] | None = None,
 ) -> dict[str, t.Any]:
-    if current:
-        hl = await Highlight.exists(id=current)
-        if not hl:
-            current = None
-    else:
-        hl = None
+    key = (user_id, guild_id, current, VIEWS.version(guild_id))
+    if (view := VIEWS.get(key)) is None:
+        view = await render_highlight_view(user_id, guild_id, current, highlights)
+        VIEWS.set(key, view)
+    return view
 
-    if not message:
-        assert user_id and guild_id
-        select = SelectHighlight(current)
-        create = CreateHighlightButton(user_id, guild_id)
-    else:
-        select = t.cast(
-            "SelectHighlight",
-            await SelectHighlight.from_partial(message.components[0].components[0]),
-        )
-        select.current = current
 
-        create = t.cast(
-            "CreateHighlightButton",
-            await CreateHighlightButton.from_partial(
-                message.components[1].components[0]
-            ),
-        )
-        user_id = create.user_id
-        guild_id = create.guild_id
+async def render_highlight_view(
+    user_id: int,
+    guild_id: int,
+    current: int | None,
+    highlights: t.Sequence[Highlight] | None,
+) -> dict[str, t.Any]:
+    if highlights is None:
+        highlights = list(await Highlight.fetchmany(user_id=user_id, guild_id=guild_id))
+    PROFILER.note("highlight_ids", [hl.id for hl in highlights])
+    PROFILER.note("regexes", sum(hl.is_regex for hl in highlights))
+    hl = next((hl for hl in highlights if hl.id == current), None)
+    if not hl:
+        current = None
+    select = SelectHighlight(current)
+    create = CreateHighlightButton(user_id, guild_id)
 
-    highlights = await Highlight.fetchmany(user_id=user_id, guild_id=guild_id)
     create.set_disabled(len(highlights) >= constants.MAX_HIGHLIGHTS_PER_USER)
     select.set_options(
         *(
@@ -120,11 +119,8 @@ async def highlight_view_msg(
             description=f"```{'re' if hl.is_regex else ''}\n{hl.content}\n```",
             color=constants.EMBED_DARK_BG,
         )
-        if hl.is_regex:
-            try:
-                Regex(hl.content)
-            except BaseException as e:
-                embed.add_field("Error", f"```re\n{e.args[0]}\n```")
+        if hl.is_regex and (error := REGEX_CACHE.error(hl.content)):
+            embed.add_field("Error", f"```re\n{error}\n```")
         if hl.channel_list:
             mode = "Ignored" if hl.channel_list_is_blacklist else "Allowed"
             embed.add_field(
@@ -153,10 +149,31 @@ async def highlight_view_msg(
     }
 
 
+async def respond_to_write(
+    ctx: flare.MessageContext | flare.ModalContext,
+    hl: Highlight | None,
+    highlights: list[Highlight],
+) -> None:
+    user_id, guild_id = ctx.user.id, unwrap(ctx.guild_id)
+    if hl:
+        INDEX.upsert(hl)
+        VIEWS.invalidate(hl.guild_id)
+        view = await highlight_view_msg(user_id, guild_id, hl.id, highlights)
+    else:
+        view = await highlight_view_msg(user_id, guild_id, None)
+
+    await ctx.edit_response(**view)
+    if not hl:
+        await ctx.respond(
+            "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
+        )
+
+
 class CreateHighlightButton(flare.Button, label="New"):
     user_id: int
     guild_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
         total = await Highlight.count(user_id=self.user_id, guild_id=self.guild_id)
         if total >= constants.MAX_HIGHLIGHTS_PER_USER:
@@ -173,74 +190,60 @@ class DeleteHighlightButton(
 ):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        await Highlight.delete_query().where(id=self.highlight_id).execute()
+        hl, highlights = await Highlight.remove(self.highlight_id)
+        if hl:
+            INDEX.remove(hl.guild_id, hl.id)
+            VIEWS.invalidate(hl.guild_id)
         await ctx.edit_response(
-            **await highlight_view_msg(None, None, None, unwrap(ctx.message))
+            **await highlight_view_msg(
+                ctx.user.id, unwrap(ctx.guild_id), None, highlights if hl else None
+            )
         )
 
 
 class ToggleIsRegex(flare.Button):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.is_regex = not hl.is_regex
-            await hl.save()
-        await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id if hl else None, ctx.message)
+        await respond_to_write(
+            ctx, *await Highlight.toggle(self.highlight_id, "is_regex")
         )
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
 
 
 class ToggleChannelListMode(flare.Button):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.channel_list_is_blacklist = not hl.channel_list_is_blacklist
-            await hl.save()
-
-        await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id if hl else None, ctx.message)
+        await respond_to_write(
+            ctx,
+            *await Highlight.toggle(self.highlight_id, "channel_list_is_blacklist"),
         )
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
 
 
 class ToggleUserListMode(flare.Button):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.user_list_is_blacklist = not hl.user_list_is_blacklist
-            await hl.save()
-
-        await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id if hl else None, ctx.message)
+        await respond_to_write(
+            ctx,
+            *await Highlight.toggle(self.highlight_id, "user_list_is_blacklist"),
         )
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
 
 
 class EditHighlightButton(flare.Button, label="Edit"):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
         hl = await Highlight.exists(id=self.highlight_id)
         if not hl:
             await ctx.edit_response(
-                **await highlight_view_msg(None, None, None, ctx.interaction.message)
+                **await highlight_view_msg(ctx.user.id, unwrap(ctx.guild_id), None)
             )
             await ctx.respond(
                 "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
@@ -254,12 +257,13 @@ class EditHighlightButton(flare.Button, label="Edit"):
 class SelectHighlight(flare.TextSelect):
     current: int | None
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
         self.current = (
             int(ctx.values[0]) if ctx.values and ctx.values[0] != "_" else None
         )
         await ctx.edit_response(
-            **await highlight_view_msg(None, None, self.current, unwrap(ctx.message))
+            **await highlight_view_msg(ctx.user.id, unwrap(ctx.guild_id), self.current)
         )
 
 
@@ -268,19 +272,13 @@ class SelectIgnoredChannels(
 ):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.channel_list = [c.id for c in ctx.channels]
-            await hl.save()
-
-        await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id if hl else None, ctx.message)
+        channels = [c.id for c in ctx.channels]
+        await respond_to_write(
+            ctx,
+            *await Highlight.update(self.highlight_id, channel_list=channels),
         )
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
 
 
 class SelectIgnoredUsers(
@@ -288,19 +286,13 @@ class SelectIgnoredUsers(
 ):
     highlight_id: int
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.MessageContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.user_list = [u.id for u in ctx.users]
-            await hl.save()
-
-        await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id if hl else None, ctx.message)
+        users = [u.id for u in ctx.users]
+        await respond_to_write(
+            ctx,
+            *await Highlight.update(self.highlight_id, user_list=users),
         )
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
 
 
 class CreateHighlightModal(flare.Modal, title="Create Highlight"):
@@ -312,6 +304,7 @@ class CreateHighlightModal(flare.Modal, title="Create Highlight"):
         style=hikari.TextInputStyle.PARAGRAPH,
     )
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.ModalContext) -> None:
         guild_id = unwrap(ctx.guild_id)
         total = await Highlight.count(user_id=self.user_id, guild_id=guild_id)
@@ -322,15 +315,18 @@ class CreateHighlightModal(flare.Modal, title="Create Highlight"):
             )
             return
 
-        await User.get_or_create(self.user_id)
-        await Guild.get_or_create(guild_id)
+        await asyncio.gather(
+            User.get_or_create(self.user_id), Guild.get_or_create(guild_id)
+        )
         hl = await Highlight(
             user_id=self.user_id,
             guild_id=guild_id,
             content=unwrap(self.content.value),
         ).create()
+        INDEX.upsert(hl)
+        VIEWS.invalidate(guild_id)
         await ctx.edit_response(
-            **await highlight_view_msg(None, None, hl.id, ctx.interaction.message)
+            **await highlight_view_msg(self.user_id, guild_id, hl.id)
         )
 
 
@@ -343,22 +339,10 @@ class EditHighlightModal(flare.Modal, title="Edit Highlight"):
         style=hikari.TextInputStyle.PARAGRAPH,
     )
 
+    @PROFILER.traced
     async def callback(self, ctx: flare.ModalContext) -> None:
-        hl = await Highlight.exists(id=self.highlight_id)
-        if hl:
-            hl.content = unwrap(self.content.value)
-            await hl.save()
-
-        await ctx.edit_response(
-            **await highlight_view_msg(
-                None,
-                None,
-                hl.id if hl else None,
-                ctx.interaction.message,
-            )
+        content = unwrap(self.content.value)
+        await respond_to_write(
+            ctx,
+            *await Highlight.update(self.highlight_id, content=content),
         )
-
-        if not hl:
-            await ctx.respond(
-                "That highlight was deleted.", flags=hikari.MessageFlag.EPHEMERAL
-            )
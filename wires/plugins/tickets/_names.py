@@ -0,0 +1,71 @@
+import bisect
+
+from wires import constants
+from wires.cache import CacheLoader, LRUCache
+from wires.database.models import TicketConfig
+
+
+def _key(name: str) -> str:
+    return name.lower()
+
+
+class TicketConfigNames:
+    # each guild's config names, sorted case-insensitively so that every name
+    # starting with a prefix is in one contiguous run. lists are replaced
+    # rather than modified, so a search that awaited a load never sees one
+    # change underneath it.
+    def __init__(self, max_guilds: int) -> None:
+        self._guilds: LRUCache[int, tuple[str, ...]] = LRUCache(max_guilds)
+        self._loader = CacheLoader(self._guilds, self._load)
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    @property
+    def hits(self) -> int:
+        return self._guilds.hits
+
+    @property
+    def misses(self) -> int:
+        return self._guilds.misses
+
+    async def search(self, guild_id: int, prefix: str, limit: int) -> list[str]:
+        names = await self.get(guild_id)
+        prefix = _key(prefix)
+        start = bisect.bisect_left(names, prefix, key=_key)
+        found = []
+        for name in names[start : start + limit]:
+            if not _key(name).startswith(prefix):
+                break
+            found.append(name)
+        return found
+
+    async def get(self, guild_id: int) -> tuple[str, ...]:
+        return await self._loader.get(guild_id)
+
+    def add(self, guild_id: int, name: str) -> None:
+        self._loader.forget(guild_id)
+        if (names := self._guilds.peek(guild_id)) is not None:
+            updated = list(names)
+            bisect.insort(updated, name, key=_key)
+            self._guilds.set(guild_id, tuple(updated))
+
+    def remove(self, guild_id: int, name: str) -> None:
+        self._loader.forget(guild_id)
+        if (names := self._guilds.peek(guild_id)) is not None:
+            self._guilds.set(guild_id, tuple(n for n in names if n != name))
+
+    def invalidate(self, guild_id: int) -> None:
+        self._loader.forget(guild_id)
+        self._guilds.discard(guild_id)
+
+    def clear(self) -> None:
+        self._loader.clear()
+        self._guilds.clear()
+
+    async def _load(self, guild_id: int) -> tuple[str, ...]:
+        configs = await TicketConfig.fetchmany(guild_id=guild_id)
+        return tuple(sorted((c.name for c in configs), key=_key))
+
+
+NAMES = TicketConfigNames(constants.MAX_CACHED_TICKET_CONFIG_GUILDS)
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+import typing as t
+
+from wires import constants, metrics
+
+LOG = logging.getLogger(__name__)
+
+# (config id, user id)
+TicketKey = tuple[int, int]
+TicketHandler = t.Callable[[int, int, str], t.Awaitable[str]]
+
+
+class TicketQueue:
+    def __init__(self, max_pending: int, workers: int) -> None:
+        self.max_pending = max_pending
+        self.workers = workers
+
+        self.completed = 0
+        self.failed = 0
+        # requests that joined one already in flight, e.g. double clicks
+        self.deduped = 0
+        # requests turned away because the queue was full
+        self.rejected = 0
+
+        self._handler: TicketHandler | None = None
+        # queued or running requests, and the futures their callers await
+        self._in_flight: dict[TicketKey, asyncio.Future[str]] = {}
+        self._queue: asyncio.Queue[tuple[TicketKey, str, float]] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def start(self, handler: TicketHandler) -> None:
+        self._handler = handler
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        for future in self._in_flight.values():
+            future.cancel()
+        self._in_flight.clear()
+        self._queue = asyncio.Queue()
+
+    def submit(
+        self, config_id: int, user_id: int, username: str
+    ) -> asyncio.Future[str] | None:
+        # callers should shield the future, since it's shared with any
+        # duplicate requests.
+        key = (config_id, user_id)
+        if (future := self._in_flight.get(key)) is not None:
+            self.deduped += 1
+            return future
+
+        if len(self._in_flight) >= self.max_pending:
+            self.rejected += 1
+            return None
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((key, username, time.monotonic()))
+        return future
+
+    async def _worker(self) -> None:
+        while True:
+            key, username, queued_at = await self._queue.get()
+            if (future := self._in_flight.get(key)) is None:
+                continue
+
+            assert self._handler
+            try:
+                result = await self._handler(*key, username)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                LOG.exception("Failed to create ticket for %s", key)
+                if not future.done():
+                    future.set_exception(e)
+                    # it's logged above, and callers that gave up (e.g. the
+                    # interaction was cancelled) would never retrieve it.
+                    future.exception()
+            else:
+                self.completed += 1
+                metrics.TICKETS.observe(time.monotonic() - queued_at)
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._in_flight.pop(key, None)
+
+
+TICKETS = TicketQueue(constants.MAX_PENDING_TICKETS, constants.TICKET_WORKERS)
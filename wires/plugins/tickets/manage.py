@@ -3,7 +3,8 @@ import crescent
 import flare
 import hikari
 
-from wires import constants
+from wires import constants, metrics
+from wires.database.changes import Change
 from wires.database.models import TicketConfig
 from wires.errors import (
     DuplicateTicketConfigName,
@@ -13,9 +14,14 @@ from wires.errors import (
 )
 
 from .. import Plugin
-from .plugin import CreateTicketButton
+from ._names import NAMES
+from .plugin import CreateTicketButton, DynamicMentions
 
 plugin = Plugin()
+
+metrics.REGISTRY.track_size("ticket_config_names", NAMES.__len__)
+metrics.REGISTRY.track_count("ticket_config_name_hits", lambda: NAMES.hits)
+metrics.REGISTRY.track_count("ticket_config_name_misses", lambda: NAMES.misses)
 group = crescent.Group(
     "tickets",
     "Manage ticket configurations.",
@@ -44,10 +50,24 @@ async def ticket_config_autocomplete(
     ctx: crescent.AutocompleteContext, option: hikari.AutocompleteInteractionOption
 ) -> list[hikari.CommandChoice]:
     assert ctx.guild_id
-    configs = await TicketConfig.fetchmany(guild_id=ctx.guild_id)
-    return [
-        hikari.CommandChoice(name=config.name, value=config.name) for config in configs
-    ]
+    names = await NAMES.search(
+        ctx.guild_id, str(option.value), constants.MAX_AUTOCOMPLETE_CHOICES
+    )
+    return [hikari.CommandChoice(name=name, value=name) for name in names]
+
+
+@plugin.include
+@crescent.event
+async def on_started(_: hikari.StartedEvent) -> None:
+    if plugin.model.config.database_url:
+        plugin.model.database.on_change("ticket_configs", on_ticket_config_change)
+
+
+def on_ticket_config_change(change: Change | None) -> None:
+    if change is None:
+        NAMES.clear()
+    else:
+        NAMES.invalidate(change.guild_id)
 
 
 @plugin.include
@@ -91,6 +111,7 @@ class NewTicketConfig:
         name = clean_name(self.name)
         if self.initial:
             validate_initial(self.initial)
+        mentions = DynamicMentions.build(self.initial or "")
 
         try:
             await TicketConfig(
@@ -98,9 +119,12 @@ class NewTicketConfig:
                 channel=self.channel.id,
                 guild_id=ctx.guild_id,
                 initial_message_content=self.initial,
+                initial_message_user_mentions=mentions.users,
+                initial_message_role_mentions=mentions.roles,
             ).create()
         except asyncpg.UniqueViolationError:
             raise DuplicateTicketConfigName(name)
+        NAMES.add(ctx.guild_id, name)
 
         await ctx.respond(
             f"Created config '{name}'. Use `/tickets entrypoint` to send an entrypoint "
@@ -127,6 +151,8 @@ class DeleteTicketConfiguration:
         )
         if not len(config):
             raise MissingTicketConfig(self.name)
+        for deleted in config:
+            NAMES.remove(ctx.guild_id, deleted.name)
         await ctx.respond(f"Deleted ticket configuration '{self.name}'.")
 
 
@@ -153,11 +179,14 @@ class RenameTicketConfiguration:
         if not config:
             raise MissingTicketConfig(self.name)
 
+        old_name = config.name
         config.name = name = clean_name(self.new_name)
         try:
             await config.save()
         except asyncpg.UniqueViolationError:
             raise DuplicateTicketConfigName(name)
+        NAMES.remove(ctx.guild_id, old_name)
+        NAMES.add(ctx.guild_id, name)
 
         await ctx.respond("Renamed ticket configuration.")
 
@@ -188,7 +217,10 @@ class EditInitialMessage:
         if not config:
             raise MissingTicketConfig(self.name)
 
+        mentions = DynamicMentions.build(self.initial or "")
         config.initial_message_content = self.initial
+        config.initial_message_user_mentions = mentions.users
+        config.initial_message_role_mentions = mentions.roles
         await config.save()
         await ctx.respond("Updated ticket configuration.")
 
@@ -1,17 +1,28 @@
+import asyncio
 import typing as t
 from dataclasses import dataclass
 
+import crescent
 import flare
 import hikari
 import regex_rs
 
+from wires import metrics
 from wires.database.models import TicketConfig
 from wires.utils import unwrap
 
 from .. import Plugin
+from ._queue import TICKETS
 
 plugin = Plugin()
 
+metrics.REGISTRY.track_size("ticket_queue", lambda: TICKETS.depth)
+metrics.REGISTRY.track_size("ticket_in_flight", lambda: TICKETS.in_flight)
+metrics.REGISTRY.track_count("tickets_completed", lambda: TICKETS.completed)
+metrics.REGISTRY.track_count("tickets_failed", lambda: TICKETS.failed)
+metrics.REGISTRY.track_count("tickets_deduped", lambda: TICKETS.deduped)
+metrics.REGISTRY.track_count("tickets_rejected", lambda: TICKETS.rejected)
+
 USER_MENTIONS_RE = regex_rs.Regex(r"<@(?P<id>\d+)>")
 ROLE_MENTIONS_RE = regex_rs.Regex(r"<@&(?P<id>\d+)>")
 
@@ -46,14 +57,19 @@ async def create_ticket(config_id: int, user: int, username: str) -> str:
         invitable=False,
     )
 
-    await plugin.app.rest.add_thread_member(thread, user)
+    # neither of these depends on the other
+    requests: list[t.Awaitable[object]] = [
+        plugin.app.rest.add_thread_member(thread, user)
+    ]
     if config.initial_message_content:
-        mentions = DynamicMentions.build(config.initial_message_content)
-        await thread.send(
-            config.initial_message_content,
-            role_mentions=mentions.roles,
-            user_mentions=mentions.users,
+        requests.append(
+            thread.send(
+                config.initial_message_content,
+                role_mentions=t.cast("list[int]", config.initial_message_role_mentions),
+                user_mentions=t.cast("list[int]", config.initial_message_user_mentions),
+            )
         )
+    await asyncio.gather(*requests)
 
     return f"Ticket created in <#{thread.id}>."
 
@@ -62,7 +78,29 @@ class CreateTicketButton(flare.Button):
     ticket_config_id: int
 
     async def callback(self, ctx: flare.MessageContext) -> None:
-        resp = await create_ticket(
-            self.ticket_config_id, ctx.user.id, ctx.user.username
-        )
+        # creating a ticket takes several requests, which can easily take
+        # longer than the interaction deadline when a panel is busy.
+        await ctx.defer(flags=hikari.MessageFlag.EPHEMERAL)
+
+        future = TICKETS.submit(self.ticket_config_id, ctx.user.id, ctx.user.username)
+        if future is None:
+            resp = "Too many tickets are being created right now, try again soon."
+        else:
+            try:
+                resp = await asyncio.shield(future)
+            except Exception:
+                # the queue has already logged it
+                resp = "Something went wrong creating your ticket, try again soon."
         await ctx.respond(resp, flags=hikari.MessageFlag.EPHEMERAL)
+
+
+@plugin.include
+@crescent.event
+async def on_started(_: hikari.StartedEvent) -> None:
+    TICKETS.start(create_ticket)
+
+
+@plugin.include
+@crescent.event
+async def on_stopping(_: hikari.StoppingEvent) -> None:
+    await TICKETS.stop()
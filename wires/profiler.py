@@ -0,0 +1,219 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import signal
+import sys
+import threading
+import time
+import types
+import typing as t
+from datetime import datetime, timezone
+
+from wires import rest_hooks
+
+LOG = logging.getLogger(__name__)
+# slow events are written here, not to the normal log
+SLOW_LOG = logging.getLogger("wires.slow_events")
+SLOW_LOG.propagate = False
+
+SAMPLE_INTERVAL = 0.005
+# samples older than this are dropped, so it bounds how much of a slow
+# event's stack history is kept
+SAMPLE_HISTORY = 60
+MAX_STACK_DEPTH = 64
+MAX_STACKS_PER_EVENT = 20
+MAX_REST_CALLS_PER_EVENT = 100
+SLOW_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_LOG_BACKUPS = 5
+
+P = t.ParamSpec("P")
+R = t.TypeVar("R")
+
+
+class Trace:
+    __slots__ = ("name", "start", "details", "rest")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = time.perf_counter()
+        self.details: dict[str, t.Any] = {}
+        # (route, seconds)
+        self.rest: list[tuple[str, float]] = []
+
+
+_TRACE: contextvars.ContextVar[Trace | None] = contextvars.ContextVar(
+    "wires_trace", default=None
+)
+
+
+def _fold(frame: types.FrameType | None) -> str:
+    # "file:function;file:function;..." from the outermost frame inwards,
+    # the format flame graph tools expect.
+    names: list[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.threshold = 1.0
+        self.path = "slow_events.jsonl"
+        self.written = 0
+        # (perf_counter, folded stack) of the event loop's thread
+        self._samples: collections.deque[tuple[float, str]] = collections.deque(
+            maxlen=int(SAMPLE_HISTORY / SAMPLE_INTERVAL)
+        )
+        self._loop_thread: int | None = None
+        self._sampler: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._handler: logging.Handler | None = None
+
+    def configure(self, threshold: float, path: str) -> None:
+        self.threshold = threshold
+        self.path = path
+
+    async def install(self, *_: object) -> None:
+        self._loop_thread = threading.get_ident()
+        if sys.platform != "win32":
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.toggle)
+
+    async def uninstall(self, *_: object) -> None:
+        if sys.platform != "win32":
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+        self.disable()
+
+    def toggle(self) -> None:
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        if self._handler is None:
+            self._handler = logging.handlers.RotatingFileHandler(
+                self.path,
+                maxBytes=SLOW_LOG_MAX_BYTES,
+                backupCount=SLOW_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            SLOW_LOG.addHandler(self._handler)
+            SLOW_LOG.setLevel(logging.INFO)
+
+        self.enabled = True
+        rest_hooks.observe(self.record_rest)
+        if self._loop_thread is not None:
+            self._stop.clear()
+            self._sampler = threading.Thread(
+                target=self._sample, name="wires-profiler", daemon=True
+            )
+            self._sampler.start()
+        LOG.info(
+            "Profiler enabled, writing events slower than %ss to %s",
+            self.threshold,
+            self.path,
+        )
+
+    def disable(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        self._samples.clear()
+        if self._handler is not None:
+            SLOW_LOG.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+        LOG.info("Profiler disabled")
+
+    def trace(self, name: str) -> t.ContextManager[None]:
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._trace(name)
+
+    def traced(
+        self, func: t.Callable[P, t.Awaitable[R]]
+    ) -> t.Callable[P, t.Coroutine[t.Any, t.Any, R]]:
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with self.trace(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    def note(self, key: str, value: t.Any) -> None:
+        if (trace := _TRACE.get()) is not None:
+            trace.details[key] = value
+
+    def record_rest(self, route: str, seconds: float) -> None:
+        trace = _TRACE.get()
+        if trace is not None and len(trace.rest) < MAX_REST_CALLS_PER_EVENT:
+            trace.rest.append((route, seconds))
+
+    @contextlib.contextmanager
+    def _trace(self, name: str) -> t.Iterator[None]:
+        trace = Trace(name)
+        token = _TRACE.set(trace)
+        try:
+            yield
+        finally:
+            _TRACE.reset(token)
+            end = time.perf_counter()
+            if self.enabled and end - trace.start >= self.threshold:
+                self._write(trace, end)
+
+    def _write(self, trace: Trace, end: float) -> None:
+        # other handlers run on the same loop while this one awaits, so the
+        # stacks are everything the loop did during the event, not only this
+        # event's own frames.
+        stacks = collections.Counter(
+            stack for at, stack in list(self._samples) if trace.start <= at <= end
+        )
+        elapsed = end - trace.start
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "event": trace.name,
+            "seconds": round(elapsed, 6),
+            "details": trace.details,
+            "rest": [{"route": r, "seconds": round(s, 6)} for r, s in trace.rest],
+            "samples": sum(stacks.values()),
+            "stacks": [
+                {"count": count, "stack": stack}
+                for stack, count in stacks.most_common(MAX_STACKS_PER_EVENT)
+            ],
+        }
+        try:
+            SLOW_LOG.info(json.dumps(record, default=str))
+        except Exception:
+            LOG.exception("Failed to write slow event %s", trace.name)
+        else:
+            self.written += 1
+
+    def _sample(self) -> None:
+        frames = sys._current_frames
+        thread = self._loop_thread
+        samples = self._samples
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = frames().get(t.cast(int, thread))
+            # an idle loop is waiting in selectors, which isn't interesting
+            if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                continue
+            samples.append((time.perf_counter(), _fold(frame)))
+
+
+PROFILER = Profiler()
@@ -0,0 +1,57 @@
+import inspect
+import logging
+import time
+import typing as t
+
+import hikari
+from hikari.internal import routes
+
+LOG = logging.getLogger(__name__)
+
+# called with the route template and how long the request took
+RestObserver = t.Callable[[str, float], None]
+
+_OBSERVERS: list[RestObserver] = []
+_patched = False
+
+
+def observe(observer: RestObserver) -> None:
+    # hikari has no hooks for REST requests, but every request goes through
+    # the private RESTClientImpl._request. it's only patched once something
+    # wants to observe requests.
+    if observer in _OBSERVERS or not (_patched or _patch()):
+        return
+    _OBSERVERS.append(observer)
+
+
+def _patch() -> bool:
+    global _patched
+
+    request = hikari.impl.RESTClientImpl._request
+    params = list(inspect.signature(request).parameters)
+    if params[1:2] != ["compiled_route"]:
+        LOG.warning(
+            "RESTClientImpl._request%s isn't the signature wires expects, so REST "
+            "requests won't be timed.",
+            inspect.signature(request),
+        )
+        return False
+
+    async def timed_request(
+        self: hikari.impl.RESTClientImpl,
+        compiled_route: routes.CompiledRoute,
+        **kwargs: t.Any,
+    ) -> t.Any:
+        start = time.perf_counter()
+        try:
+            return await request(self, compiled_route, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = str(compiled_route.route)
+            for observer in _OBSERVERS:
+                observer(route, elapsed)
+
+    # the client is slotted, so it's patched on the class
+    hikari.impl.RESTClientImpl._request = timed_request  # type: ignore
+    _patched = True
+    return True
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+LOG = logging.getLogger(__name__)
+
+# how often the loop checks in, as a fraction of the threshold
+BEAT_FRACTION = 0.25
+
+
+class Watchdog:
+    # the loop can't notice that it's blocked, so a thread watches for it to
+    # stop checking in and grabs its stack while it's still stuck.
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.interval = threshold * BEAT_FRACTION
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="wires-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            # the thread wakes up at least every interval
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        stalled_at: float | None = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            lag = time.monotonic() - beat - self.interval
+            if lag < self.threshold:
+                if stalled_at is not None and beat > stalled_at:
+                    LOG.warning(
+                        "Event loop was blocked for about %.2fs",
+                        beat - stalled_at - self.interval,
+                    )
+                    stalled_at = None
+                continue
+
+            # one report per stall
+            if stalled_at is not None:
+                continue
+            stalled_at = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame else "unknown"
+            LOG.warning(
+                "Event loop blocked for %.2fs, currently running:\n%s", lag, stack
+            )